@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 import argparse
 import asyncio
+import json
+import math
 import re
 import sys
+import time
+from collections import Counter, OrderedDict
 from datetime import datetime
 
 from playwright.async_api import async_playwright
@@ -16,6 +20,79 @@ BROWSER_MAP = {
     "webkit": "webkit",
     "safari": "webkit",
 }
+DEFAULT_CONCURRENCY = 8
+PREFIXES = {"warning": "⚠️  [WARNING]", "error": "❌ [ERROR]"}
+BUFFERING_MODES = ("line", "block")
+SINK_QUEUE_SIZE = 10000  # console messages waiting for the writer
+SINK_BATCH = 1000  # messages formatted and written at once
+BLOCK_SIZE = 64 * 1024  # output buffer in block mode
+FLUSH_INTERVAL = 0.5  # seconds between flushes in block mode
+DEDUP_ENTRIES = 4096  # messages remembered by --dedup, least recent forgotten
+PREVIEW_LENGTH = 120  # characters of a message kept for its repeat summary
+LIMIT_REPORT_INTERVAL = 1.0  # seconds between rate limit reports
+METRICS_INTERVAL = 5.0  # seconds between CDP Performance.getMetrics samples
+RULE_NAME = re.compile(r"([A-Za-z_][\w.-]*)=")
+DEFAULT_FLAGS = re.compile("").flags
+
+# CDP Performance.getMetrics values kept by --metrics, as (series, scale).
+# Sampled ones are summarised over every sample, cumulative ones by their
+# last value on each page.
+SAMPLED_METRICS = {
+    "JSHeapUsedSize": ("JS heap (MB)", 1 / 2**20),
+    "Nodes": ("DOM nodes", 1),
+}
+CUMULATIVE_METRICS = {
+    "LayoutCount": ("layouts", 1),
+    "RecalcStyleCount": ("style recalcs", 1),
+    "ScriptDuration": ("script (ms)", 1000),
+    "TaskDuration": ("tasks (ms)", 1000),
+}
+# Navigation Timing fields kept by --metrics, in ms from the navigation start
+NAVIGATION_METRICS = {
+    "responseStart": "page TTFB (ms)",
+    "domContentLoadedEventEnd": "DOMContentLoaded (ms)",
+    "loadEventEnd": "load (ms)",
+}
+NAVIGATION_SCRIPT = (
+    "performance.getEntriesByType('navigation').map((entry) => entry.toJSON())[0]"
+    " || null"
+)
+# page.goto() returns on the load event, before loadEventEnd is set
+NAVIGATION_DONE_SCRIPT = (
+    "(performance.getEntriesByType('navigation')[0]?.loadEventEnd || 0) > 0"
+)
+NAVIGATION_TIMEOUT = 5000  # ms
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Wraps the page's console methods so that calls whose text can't match
+# the filter never leave the page. Only all-primitive arguments are
+# checked: objects are previewed by the browser, so those always go out.
+PREFILTER_SCRIPT = """(() => {
+  const needles = %(needles)s;
+  const fold = %(fold)s;
+  const primitive = new Set(["string", "number", "boolean", "undefined"]);
+  globalThis.__debugWithPrefiltered = 0;
+  const wanted = (args) => {
+    if (!args.every((arg) => arg === null || primitive.has(typeof arg))) {
+      return true;
+    }
+    let text = args.map(String).join(" ");
+    if (fold) text = text.toLowerCase();
+    return needles.some((needle) => text.includes(needle));
+  };
+  for (const method of ["log", "info", "warn", "error", "debug", "trace"]) {
+    const original = console[method];
+    if (typeof original !== "function") continue;
+    console[method] = function (...args) {
+      if (wanted(args)) return original.apply(this, args);
+      globalThis.__debugWithPrefiltered++;
+    };
+  }
+})();"""
 
 
 def log(message):
@@ -23,53 +100,1007 @@ def log(message):
     print(f"[{time_str}] {message}")
 
 
-async def run(browser_name, url, regex_pattern):
-    # Compile regex before launching the browser
-    try:
-        pattern = re.compile(regex_pattern)
-    except re.error as e:
-        log(f"❌ Regex error: {e}")
-        sys.exit(1)
+def read_url_file(path):
+    """URLs from a text file, one per line; blank lines and # comments skipped."""
+    with open(path, encoding="utf-8") as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return [line for line in lines if line]
 
-    # Validate URL
-    if not url.startswith(("http://", "https://")):
-        log("❌ URL must start with http:// or https://")
-        sys.exit(1)
 
-    async with async_playwright() as p:
-        browser_type = getattr(p, BROWSER_MAP[browser_name])
+def parse_rule(text):
+    """(name, regex) from "NAME=REGEX"; ValueError if there is no name."""
+    match = RULE_NAME.match(text)
+    if not match:
+        raise ValueError(f"expected NAME=REGEX: {text}")
+    return match.group(1), text[match.end() :]
+
+
+def read_rules_file(path):
+    """Named filter rules from a text file, one "NAME=REGEX" per line.
+
+    Blank lines and lines starting with # are skipped; a # anywhere else is
+    part of the regex. ValueError for a line without a name.
+    """
+    rules = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            try:
+                rules.append(parse_rule(line))
+            except ValueError as e:
+                raise ValueError(f"line {number}: {e}") from None
+    return rules
+
+
+def parse_rate_limit(text):
+    """(type, messages per second) from "TYPE=N", or (None, N) for all types."""
+    kind, _, rate = text.rpartition("=")
+    rate = float(rate)
+    if rate <= 0:
+        raise ValueError(f"rate must be positive: {text}")
+    kind = kind.lower()
+    return ("warning" if kind == "warn" else kind) or None, rate
+
+
+class Deduplicator:
+    """Collapses repeats of a message within a sliding `window` (seconds).
+
+    The first copy is printed; copies arriving before the window is over are
+    only counted, and summarised as "(repeated ×N in Xs)" once it is. While
+    they keep coming, a summary follows every window. Messages are known by
+    a hash, in an LRU of `max_entries`, so memory stays bounded however many
+    different messages go by; a forgotten one just prints again.
+    """
+
+    def __init__(self, window, max_entries=DEDUP_ENTRIES):
+        self.window = window
+        self.max_entries = max_entries
+        self._seen = OrderedDict()  # hash -> [window start, repeats, head, preview]
+        self._repeating = {}  # entries with repeats not yet summarised
+        self.collapsed = 0
+
+    def first(self, head, text, now):
+        """Whether this message (`head` being its prefix) should be printed."""
+        key = hash((head, text))
+        # Forgotten entries with repeats to summarise are still in _repeating
+        entry = self._seen.pop(key, None) or self._repeating.get(key)
+        if entry is None or not entry[1] and now - entry[0] >= self.window:
+            entry = [now, 0, head, text[:PREVIEW_LENGTH]]
+            printed = True
+        else:
+            entry[1] += 1
+            self._repeating[key] = entry
+            self.collapsed += 1
+            printed = False
+        self._seen[key] = entry
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return printed
+
+    def summaries(self, now, final=False):
+        """Summary lines for the windows over by `now` (all, if `final`)."""
+        lines = []
+        for key, entry in list(self._repeating.items()):
+            start, repeats, head, preview = entry
+            if final or now - start >= self.window:
+                lines.append(
+                    f"{head}(repeated ×{repeats} in {now - start:.1f}s) {preview}\n"
+                )
+                entry[0], entry[1] = now, 0
+                del self._repeating[key]
+        return lines
+
+
+class RateLimiter:
+    """Token buckets capping the messages printed per second, by type.
+
+    `limits` maps a console type ("log", "warning", "error", ...) or None,
+    for the others, to messages per second; up to a second's worth can go
+    out at once. Messages over the limit are counted and reported at most
+    every LIMIT_REPORT_INTERVAL.
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        self._buckets = {}  # type -> [tokens, last refill]
+        self.limited = Counter()
+        self._unreported = Counter()
+        self._reported_at = 0.0
+
+    def allow(self, kind, now):
+        rate = self.limits.get(kind, self.limits.get(None))
+        if rate is None:
+            return True
+        bucket = self._buckets.setdefault(kind, [rate, now])
+        bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True
+        self.limited[kind] += 1
+        self._unreported[kind] += 1
+        return False
+
+    def report(self, now, final=False):
+        """Lines counting the messages held back since the last report."""
+        if not self._unreported or (
+            not final and now - self._reported_at < LIMIT_REPORT_INTERVAL
+        ):
+            return []
+        lines = [
+            f"⚠️  [LIMITED] {count} {kind} message(s) over the rate limit\n"
+            for kind, count in self._unreported.items()
+        ]
+        self._unreported.clear()
+        self._reported_at = now
+        return lines
+
+
+class ConsoleSink:
+    """Console messages go through a bounded queue to one writer task.
+
+    Page callbacks only enqueue, so a chatty page costs the event loop next
+    to nothing; the writer filters, formats and writes whole batches. When
+    the queue is full, messages are dropped and counted instead of stalling
+    the page, and the count is printed with the output.
+
+    "line" buffering flushes after every batch; "block" buffering writes
+    through a 64 KiB buffer flushed every FLUSH_INTERVAL, which is cheaper
+    for a terminal or pipe that can't keep up.
+
+    Messages are kept if `matcher` (a RuleMatcher) matches them; with
+    `tag_rules` each line names its rule. Hits per rule are kept in `hits`,
+    and for a page load given to track(), matching messages by type in
+    `loads` and messages lost to a full queue in `load_dropped`. Matching messages then go through `dedup` (a Deduplicator) and
+    `limiter` (a RateLimiter), when given.
+    """
+
+    def __init__(
+        self,
+        matcher,
+        buffering="line",
+        max_queued=SINK_QUEUE_SIZE,
+        tag_rules=False,
+        dedup=None,
+        limiter=None,
+    ):
+        self.matcher = matcher
+        self.tag_rules = tag_rules
+        self.dedup = dedup
+        self.limiter = limiter
+        self.hits = Counter()
+        self.loads = {}  # load -> Counter of matching messages by type
+        self.load_dropped = {}  # load -> messages dropped, matching or not
+        self.buffering = buffering
+        if buffering == "block":
+            self._stream = open(
+                sys.stdout.fileno(),
+                "w",
+                encoding="utf-8",
+                buffering=BLOCK_SIZE,
+                closefd=False,
+            )
+        else:
+            self._stream = sys.stdout
+        self._queue = asyncio.Queue(max_queued)
+        self._task = None
+        self.written = self.dropped = 0
+        self.prefiltered = 0  # dropped inside the pages (--prefilter)
+        self._reported = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def push(self, tag, msg, load=None):
+        try:
+            self._queue.put_nowait((tag, msg.type, msg.text, load))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if load in self.load_dropped:
+                self.load_dropped[load] += 1
+
+    def track(self, load):
+        """Count the messages pushed for `load` until untrack() (see above)."""
+        self.loads[load] = Counter()
+        self.load_dropped[load] = 0
+
+    def untrack(self, load):
+        self.loads.pop(load, None)
+        self.load_dropped.pop(load, None)
+
+    async def drain(self):
+        """Wait until everything pushed so far has been written."""
+        await self._queue.join()
+
+    async def _run(self):
+        # Wake up regularly to flush, and for summaries that are due
+        timed = self.buffering == "block" or self.dedup or self.limiter
+        timeout = FLUSH_INTERVAL if timed else None
+        while True:
+            try:
+                batch = [await asyncio.wait_for(self._queue.get(), timeout)]
+            except asyncio.TimeoutError:
+                batch = []
+            while len(batch) < SINK_BATCH and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._write(batch)
+            if self.buffering == "line" or not batch:
+                self._stream.flush()
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch, final=False):
+        match = self.matcher.match
+        now = time.monotonic()
+        lines = []
+        for tag, kind, text, load in batch:
+            rule = match(text)
+            if rule is None:
+                continue
+            self.hits[rule] += 1
+            if load in self.loads:
+                self.loads[load][kind] += 1
+            if self.tag_rules:
+                tag = f"{tag}[{rule}] "
+            head = f"{PREFIXES.get(kind) or f'[{kind.upper()}]'} {tag}"
+            if self.dedup and not self.dedup.first(head, text, now):
+                continue
+            if self.limiter and not self.limiter.allow(kind, now):
+                continue
+            lines.append(f"{head}{text}\n")
+        if self.dedup:
+            lines += self.dedup.summaries(now, final)
+        if self.limiter:
+            lines += self.limiter.report(now, final)
+        if self.dropped > self._reported:
+            lines.append(
+                f"⚠️  [DROPPED] {self.dropped - self._reported} console "
+                "message(s) dropped, output can't keep up\n"
+            )
+            self._reported = self.dropped
+        if lines:
+            self._stream.write("".join(lines))
+            self.written += len(lines)
+
+    def close(self):
+        """Stop the writer and write out whatever is still queued."""
+        if self._task:
+            self._task.cancel()
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        self._write(batch, final=True)
+        self._stream.flush()
+
+
+class MetricsRecorder:
+    """Performance metrics of the watched pages, for --metrics.
+
+    Collects request timings, Navigation Timing and (on Chromium, through a
+    CDP session) Performance.getMetrics samples every `interval` seconds.
+    Values go into named series summarised by report(); with `path`, every
+    record is also written there as a JSON line.
+    """
+
+    def __init__(self, path=None, interval=METRICS_INTERVAL, cdp=True):
+        self.interval = interval
+        self.cdp = cdp
+        self.series = {}
+        self.requests = self.failed = 0
+        self._file = open(path, "w", encoding="utf-8") if path else None
+
+    def add(self, series, value):
+        self.series.setdefault(series, []).append(value)
+
+    def record(self, kind, url, **fields):
+        if self._file:
+            line = {"time": round(time.time(), 3), "type": kind, "url": url, **fields}
+            self._file.write(json.dumps(line) + "\n")
+
+    def attach(self, page, url):
+        """Time the requests of `page` (loading `url`) from its events."""
+        pending = {}  # request -> [started, TTFB ms, status]
+
+        def on_request(request):
+            pending[request] = [time.monotonic(), None, None]
+
+        def on_response(response):
+            entry = pending.get(response.request)
+            if entry:
+                entry[1] = 1000 * (time.monotonic() - entry[0])
+                entry[2] = response.status
+
+        def on_finished(request):
+            entry = pending.pop(request, None)
+            if not entry:
+                return
+            started, ttfb, status = entry
+            duration = 1000 * (time.monotonic() - started)
+            # Prefer the browser's own timing, free of protocol delays
+            timing = request.timing or {}
+            if timing.get("responseEnd", -1) > 0:
+                ttfb, duration = timing["responseStart"], timing["responseEnd"]
+            self.requests += 1
+            if ttfb is not None:
+                self.add("request TTFB (ms)", ttfb)
+            self.add("request (ms)", duration)
+            self.record(
+                "request",
+                url,
+                resource=request.url,
+                method=request.method,
+                resource_type=request.resource_type,
+                status=status,
+                ttfb_ms=None if ttfb is None else round(ttfb, 2),
+                duration_ms=round(duration, 2),
+            )
+
+        def on_failed(request):
+            if pending.pop(request, None):
+                self.failed += 1
+                self.record(
+                    "request",
+                    url,
+                    resource=request.url,
+                    method=request.method,
+                    resource_type=request.resource_type,
+                    failure=request.failure,
+                )
+
+        page.on("request", on_request)
+        page.on("response", on_response)
+        page.on("requestfinished", on_finished)
+        page.on("requestfailed", on_failed)
+
+    async def navigation(self, page, url, loaded=False):
+        """Record the Navigation Timing entry of `page`; False if it can't.
+
+        With `loaded` (right after page.goto()), wait for the load event to
+        end first, so that every field is filled in.
+        """
+        try:
+            if loaded:
+                await page.wait_for_function(
+                    NAVIGATION_DONE_SCRIPT, timeout=NAVIGATION_TIMEOUT
+                )
+            entry = await page.evaluate(NAVIGATION_SCRIPT)
+        except Exception:
+            return False  # page gone or navigating
+        if not entry:
+            return False
+        for field, series in NAVIGATION_METRICS.items():
+            if entry.get(field, 0) > 0:  # 0: not reached yet
+                self.add(series, entry[field])
+        fields = ("duration", "transferSize", "domInteractive", *NAVIGATION_METRICS)
+        self.record(
+            "navigation",
+            url,
+            navigation_type=entry.get("type"),
+            **{field: entry.get(field) for field in fields},
+        )
+        return True
+
+    async def sample(self, context, page, url):
+        """Sample Performance.getMetrics until cancelled (Chromium only)."""
+        if not self.cdp:
+            return
+        try:
+            session = await context.new_cdp_session(page)
+            await session.send("Performance.enable")
+        except Exception:
+            return
+        last = {}
+        try:
+            while True:
+                try:
+                    response = await session.send("Performance.getMetrics")
+                except Exception:
+                    break  # page closed
+                last = {
+                    metric["name"]: metric["value"]
+                    for metric in response["metrics"]
+                    if metric["name"] in SAMPLED_METRICS
+                    or metric["name"] in CUMULATIVE_METRICS
+                }
+                for name, (series, scale) in SAMPLED_METRICS.items():
+                    if name in last:
+                        self.add(series, last[name] * scale)
+                self.record("sample", url, **last)
+                await asyncio.sleep(self.interval)
+        finally:
+            for name, (series, scale) in CUMULATIVE_METRICS.items():
+                if name in last:
+                    self.add(series, last[name] * scale)
+
+    def report(self):
+        """Print p50/p95/max of every series."""
+        if self._file:
+            self._file.close()
+        log(f"📈 Metrics: {self.requests} request(s), {self.failed} failed")
+        if not self.series:
+            return
+        print(f"   {'':<22} {'count':>7} {'p50':>10} {'p95':>10} {'max':>10}")
+        for series, values in self.series.items():
+            values = sorted(values)
+            print(
+                f"   {series:<22} {len(values):>7} {_percentile(values, 0.50):>10.1f} "
+                f"{_percentile(values, 0.95):>10.1f} {values[-1]:>10.1f}"
+            )
+
+
+def _percentile(values, q):
+    # Nearest rank, `values` being sorted
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def _required_literals(nodes):
+    """Strings, one of which is in every match of the parsed regex `nodes`.
+
+    None when no such set can be found (e.g. for ".*"). Keeps the set whose
+    shortest string is longest, as it rules out the most messages.
+    """
+    best, run = None, []
+
+    def consider(candidate):
+        nonlocal best
+        if candidate and (
+            best is None or min(map(len, candidate)) > min(map(len, best))
+        ):
+            best = candidate
+
+    for op, arg in nodes:
+        name = str(op)
+        if name == "LITERAL":
+            run.append(chr(arg))
+            continue
+        # Anything else ends the current run of literal characters
+        consider({"".join(run)} if run else None)
+        run = []
+        if name == "SUBPATTERN":
+            consider(_required_literals(arg[-1]))
+        elif name == "ATOMIC_GROUP":
+            consider(_required_literals(arg))
+        elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") and arg[0]:
+            consider(_required_literals(arg[2]))
+        elif name == "BRANCH":
+            alternatives = [_required_literals(branch) for branch in arg[1]]
+            if all(alternatives):
+                consider(set().union(*alternatives))
+    consider({"".join(run)} if run else None)
+    return best
+
+
+def _folds(pattern):
+    """Whether `pattern` (compiled) ignores case, everywhere or in a group."""
+    return bool(
+        pattern.flags & re.IGNORECASE or re.search(r"\(\?[a-zA-Z-]*i", pattern.pattern)
+    )
+
+
+def prefilter_script(patterns):
+    """Init script dropping console calls that can't match any of `patterns`.
+
+    The page only checks for literal text the regexes require, which works
+    whatever the differences between Python and JavaScript regexes; the
+    full regexes still run on what gets through. None if some regex
+    requires no literal text.
+    """
+    needles, fold = set(), False
+    for pattern in patterns:
+        try:
+            required = _required_literals(
+                sre_parse.parse(pattern.pattern, pattern.flags)
+            )
+        except Exception:
+            return None
+        if not required:
+            return None
+        needles |= required
+        fold = fold or _folds(pattern)
+    if fold:
+        if not all(needle.isascii() for needle in needles):
+            return None  # JS and Python lowercase non-ASCII differently
+        needles = {needle.lower() for needle in needles}
+    return PREFILTER_SCRIPT % {
+        "needles": json.dumps(sorted(needles)),
+        "fold": "true" if fold else "false",
+    }
+
+
+def _literal(pattern):
+    """The text `pattern` (compiled) matches if it has no regex syntax, or None."""
+    if pattern.flags != DEFAULT_FLAGS:
+        return None
+    nodes = sre_parse.parse(pattern.pattern)
+    if not nodes or any(str(op) != "LITERAL" for op, _ in nodes):
+        return None
+    return "".join(chr(arg) for _, arg in nodes)
+
+
+def _trie_regex(trie):
+    """Regex matching the strings of `trie`, a dict of dicts ("" ends a word).
+
+    Shared prefixes are written once, so the regex engine rules out all the
+    strings starting with another character in one comparison, and the
+    longest string starting at a position is the one matched.
+    """
+    branches = [
+        re.escape(char) + _trie_regex(rest)
+        for char, rest in sorted(trie.items())
+        if char
+    ]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    if "" in trie:  # a shorter word ends here, try the longer ones first
+        return f"(?:{body})?"
+    return body
 
-        log(f"🚀 Launching {browser_name} on {url}")
-        log(f"🔍 Active filter (regex): '{regex_pattern}'")
-        log("Press Ctrl+C to stop.")
 
-        browser = await browser_type.launch(headless=False)
-        context = await browser.new_context()
-        page = await context.new_page()
+class RuleMatcher:
+    """Named filter rules, matched without searching each one in turn.
 
-        def on_console(msg):
-            if pattern.search(msg.text):
-                prefix = {
-                    "warning": "⚠️  [WARNING]",
-                    "error": "❌ [ERROR]",
-                }.get(msg.type, f"[{msg.type.upper()}]")
-                print(f"{prefix} {msg.text}")
+    Every rule is reduced to literal text one of which any match contains
+    (see _required_literals), and all of those go in a trie scanned once per
+    message. Rules without regex syntax are then matched outright; the
+    others are searched only if their text was found. Rules with no such
+    text are searched on every message. match() names the rule matching
+    earliest in the message, the first one given on ties.
+    """
 
-        page.on("console", on_console)
+    def __init__(self, rules):
+        self.names = []
+        self.patterns = []
+        self._literals = set()  # rules matched by the scan alone
+        self._always = []  # rules searched on every message
+        needles = ({}, {})  # exact and case-folded: text -> rule indexes
+        for i, (name, regex) in enumerate(rules):
+            pattern = re.compile(regex)
+            self.names.append(name or regex)
+            self.patterns.append(pattern)
+            literal = _literal(pattern)
+            if literal is not None:
+                self._literals.add(i)
+                needles[0].setdefault(literal, set()).add(i)
+                continue
+            try:
+                required = _required_literals(sre_parse.parse(regex, pattern.flags))
+            except Exception:
+                required = None
+            fold = _folds(pattern)
+            if not required or fold and not all(text.isascii() for text in required):
+                self._always.append(i)
+                continue
+            for text in required:
+                needles[fold].setdefault(text.lower() if fold else text, set()).add(i)
 
+        # One scan per case mode: a plain search finds the first needle
+        # quickly (most messages have none), then a lookahead scan sees the
+        # longest needle at each position, standing for its prefixes too.
+        self._scans = []
+        for fold, table in enumerate(needles):
+            if not table:
+                continue
+            trie = {}
+            for text in table:
+                node = trie
+                for char in text:
+                    node = node.setdefault(char, {})
+                node[""] = {}
+            closed = {
+                text: set().union(
+                    *(table.get(text[:end], ()) for end in range(1, len(text) + 1))
+                )
+                for text in table
+            }
+            flags = re.IGNORECASE if fold else 0
+            first = re.compile(_trie_regex(trie), flags)
+            scan = re.compile(f"(?=({first.pattern}))", flags)
+            everyone = set().union(*table.values())
+            self._scans.append((first, scan, closed, bool(fold), everyone))
+
+    def match(self, text):
+        """Name of the rule matching `text`, or None."""
+        best = None
+        candidates = set(self._always)
+        for first, scan, closed, fold, everyone in self._scans:
+            found = first.search(text)
+            if not found:
+                continue
+            for found in scan.finditer(text, found.start()):
+                needle = found.group(1)
+                rules = closed.get(needle.lower() if fold else needle, everyone)
+                for i in rules:
+                    if i not in self._literals:
+                        candidates.add(i)
+                    elif best is None or (found.start(), i) < best:
+                        best = (found.start(), i)
+        for i in candidates:
+            found = self.patterns[i].search(text)
+            if found and (best is None or (found.start(), i) < best):
+                best = (found.start(), i)
+        return None if best is None else self.names[best[1]]
+
+
+async def watch_page(
+    browser, url, sink, slots, duration=None, tag="", init_script=None, metrics=None
+):
+    """Send the console messages of `url` to `sink` (a ConsoleSink).
+
+    The page gets its own browser context, opened once one of the `slots`
+    (a semaphore) is free, with `init_script` (see prefilter_script) run in
+    every frame and its performance recorded by `metrics` (a
+    MetricsRecorder). It is watched for `duration` seconds after loading,
+    or until cancelled. Returns False if the page failed to load.
+    """
+    async with slots:
+        context = await _new_context(browser, init_script)
+        page = sampler = None
+        navigated = False
+        try:
+            page = await context.new_page()
+            page.on("console", lambda msg: sink.push(tag, msg))
+            if metrics:
+                metrics.attach(page, url)
+                sampler = asyncio.create_task(metrics.sample(context, page, url))
+
+            try:
+                await page.goto(url)
+            except Exception as e:
+                log(f"❌ {tag}Error loading URL: {e}")
+                return False
+            if metrics:
+                # Now, as on Ctrl+C the browser is already closing at teardown
+                navigated = await metrics.navigation(page, url, loaded=True)
+
+            if duration is None:
+                await asyncio.Future()
+            else:
+                await asyncio.sleep(duration)
+            return True
+        finally:
+            if page:
+                await _finish_page(
+                    page, url, sink, sampler, init_script, metrics, navigated
+                )
+            await context.close()
+
+
+async def _new_context(browser, init_script=None):
+    context = await browser.new_context()
+    if init_script:
+        await context.add_init_script(init_script)
+    return context
+
+
+async def _finish_page(page, url, sink, sampler, init_script, metrics, navigated=False):
+    """Collect what a page recorded before it is closed.
+
+    Navigation Timing is read here only if it wasn't after loading
+    (`navigated`).
+    """
+    if sampler:
+        sampler.cancel()
+        await asyncio.gather(sampler, return_exceptions=True)
+    if metrics and not navigated:
+        await metrics.navigation(page, url)
+    if init_script:
+        try:
+            sink.prefiltered += await page.evaluate(
+                "globalThis.__debugWithPrefiltered || 0"
+            )
+        except Exception:
+            pass  # page gone or navigating
+
+
+async def benchmark_page(
+    browser,
+    url,
+    sink,
+    repeat,
+    results,
+    cache="cold",
+    settle=None,
+    tag="",
+    init_script=None,
+    metrics=None,
+):
+    """Load `url` `repeat` times, adding a timing dict per load to `results`.
+
+    With a "cold" cache every load gets a fresh context; with "warm" they
+    share one, after a first load that isn't counted. Each load is timed to
+    the load event and to network idle (None if it never gets there), then
+    kept open `settle` more seconds; the console errors and warnings
+    matching the filters are counted, along with the messages dropped by a
+    full sink queue, which may have matched. Failed loads add None.
+    """
+    shared = None
+    if cache == "warm":
+        shared = await _new_context(browser, init_script)
+    try:
+        if shared:
+            await _timed_load(shared, url, sink, None, tag, init_script, None)
+        for _ in range(repeat):
+            context = shared or await _new_context(browser, init_script)
+            try:
+                results.append(
+                    await _timed_load(
+                        context, url, sink, settle, tag, init_script, metrics
+                    )
+                )
+            finally:
+                if not shared:
+                    await context.close()
+    finally:
+        if shared:
+            await shared.close()
+
+
+async def _timed_load(context, url, sink, settle, tag, init_script, metrics):
+    page = await context.new_page()
+    sampler = None
+    navigated = False
+    sink.track(page)
+    page.on("console", lambda msg: sink.push(tag, msg, page))
+    if metrics:
+        metrics.attach(page, url)
+        sampler = asyncio.create_task(metrics.sample(context, page, url))
+    try:
+        started = time.perf_counter()
         try:
-            await page.goto(url)
+            await page.goto(url, wait_until="load")
         except Exception as e:
-            log(f"❌ Error loading URL: {e}")
-            await browser.close()
+            log(f"❌ {tag}Error loading URL: {e}")
+            return None
+        load = time.perf_counter() - started
+        try:
+            await page.wait_for_load_state("networkidle")
+            idle = time.perf_counter() - started
+        except Exception:
+            idle = None  # still busy after Playwright's timeout
+        if metrics:
+            navigated = await metrics.navigation(page, url, loaded=True)
+        if settle:
+            await asyncio.sleep(settle)
+        await sink.drain()
+        counts = sink.loads[page]
+        result = {
+            "load_ms": round(1000 * load, 1),
+            "networkidle_ms": None if idle is None else round(1000 * idle, 1),
+            "errors": counts["error"],
+            "warnings": counts["warning"],
+            "dropped": sink.load_dropped[page],
+        }
+        if metrics:
+            metrics.record("load", url, **result)
+        return result
+    finally:
+        await _finish_page(page, url, sink, sampler, init_script, metrics, navigated)
+        await page.close()
+        sink.untrack(page)
+
+
+def print_benchmark(url, results, cache):
+    """Print min/median/p95/max of the loads of `url` (see benchmark_page)."""
+    loads = [result for result in results if result]
+    log(f"⏱️  {url}: {len(loads)}/{len(results)} load(s), {cache} cache")
+    if not loads:
+        return
+    print(f"   {'':<18} {'min':>9} {'median':>9} {'p95':>9} {'max':>9}")
+    for label, key, spec in (
+        ("load (ms)", "load_ms", ".1f"),
+        ("networkidle (ms)", "networkidle_ms", ".1f"),
+        ("errors", "errors", "d"),
+        ("warnings", "warnings", "d"),
+        ("dropped", "dropped", "d"),
+    ):
+        values = sorted(load[key] for load in loads if load[key] is not None)
+        if not values:
+            print(f"   {label:<18} {'-':>9} {'-':>9} {'-':>9} {'-':>9}")
+            continue
+        stats = (
+            values[0],
+            _percentile(values, 0.50),
+            _percentile(values, 0.95),
+            values[-1],
+        )
+        print(f"   {label:<18}", *(format(value, f">9{spec}") for value in stats))
+    dropped = sum(load["dropped"] for load in loads)
+    if dropped:
+        print(
+            f"   ⚠️  {dropped} console message(s) dropped by a full queue: errors "
+            "and warnings are lower bounds (raise --queue-size)"
+        )
+
+
+async def run(
+    browser_name,
+    urls,
+    rules,
+    headless=False,
+    concurrency=DEFAULT_CONCURRENCY,
+    duration=None,
+    buffering="line",
+    queue_size=SINK_QUEUE_SIZE,
+    prefilter=False,
+    dedup_window=None,
+    rate_limits=None,
+    metrics=False,
+    metrics_file=None,
+    metrics_interval=METRICS_INTERVAL,
+    repeat=None,
+    cache="cold",
+):
+    """Watch the console of one URL or many, all in a single browser.
+
+    Messages are kept if they match one of `rules`, (name, regex) pairs or
+    a single regex; with several rules, or a named one, each line is tagged
+    with its rule and hits per rule are counted at the end. Each URL gets
+    its own context, at most `concurrency` at a time; with several URLs
+    every line is tagged with the URL it came from. Without
+    `duration` pages are watched until Ctrl+C, otherwise each is closed
+    `duration` seconds after loading and the run ends after the last one.
+    Output goes through a ConsoleSink with the given `buffering` and
+    `queue_size`. With `prefilter`, pages drop console calls that can't
+    match before they are sent to Python. `dedup_window` (seconds) collapses
+    repeated messages and `rate_limits` ({type or None: messages per second})
+    caps how many are printed. With `metrics`, page performance is recorded
+    (see MetricsRecorder), summarised at the end and written to
+    `metrics_file` as JSON lines if given.
+
+    With `repeat`, each URL is instead loaded that many times in turn with a
+    `cache` "cold" or "warm" (see benchmark_page), kept open `duration`
+    seconds after network idle, and the load times are printed at the end.
+    """
+    if isinstance(urls, str):
+        urls = [urls]
+    if isinstance(rules, str):
+        rules = [(None, rules)]
+
+    # Compile regexes before launching the browser
+    for name, regex in rules:
+        try:
+            re.compile(regex)
+        except re.error as e:
+            log(f"❌ Regex error{f' in rule {name}' if name else ''}: {e}")
             sys.exit(1)
+    matcher = RuleMatcher(rules)
+    tag_rules = len(rules) > 1 or rules[0][0] is not None
 
+    # Validate URLs
+    for url in urls:
+        if not url.startswith(("http://", "https://")):
+            log(f"❌ URL must start with http:// or https://: {url}")
+            sys.exit(1)
+
+    recorder = None
+    if metrics or metrics_file:
+        cdp = BROWSER_MAP[browser_name] == "chromium"
+        try:
+            recorder = MetricsRecorder(metrics_file, metrics_interval, cdp)
+        except OSError as e:
+            log(f"❌ Can't write metrics: {e}")
+            sys.exit(1)
+
+    async with async_playwright() as p:
+        browser_type = getattr(p, BROWSER_MAP[browser_name])
+
+        if len(urls) == 1:
+            log(f"🚀 Launching {browser_name} on {urls[0]}")
+        elif repeat:
+            log(f"🚀 Launching {browser_name} on {len(urls)} URLs (one at a time)")
+        else:
+            log(
+                f"🚀 Launching {browser_name} on {len(urls)} URLs "
+                f"({min(concurrency, len(urls))} at a time)"
+            )
+        if len(rules) == 1:
+            log(f"🔍 Active filter (regex): '{rules[0][1]}'")
+        else:
+            log(f"🔍 Active filters: {len(rules)} rules")
+        init_script = None
+        if prefilter:
+            init_script = prefilter_script(matcher.patterns)
+            if init_script:
+                log("🧹 Prefiltering console calls inside the page.")
+            else:
+                log("No literal text in the filter to prefilter on, sending all.")
+        dedup = limiter = None
+        if dedup_window:
+            dedup = Deduplicator(dedup_window)
+            log(f"🔁 Collapsing repeated messages within {dedup_window:g}s.")
+        if rate_limits:
+            limiter = RateLimiter(rate_limits)
+            limits = ", ".join(
+                f"{kind or 'others'} {rate:g}/s" for kind, rate in rate_limits.items()
+            )
+            log(f"🚦 Rate limits: {limits}")
+        if recorder:
+            log(
+                "📈 Recording page metrics"
+                + (f" every {metrics_interval:g}s" if recorder.cdp else "")
+                + (f" to {metrics_file}" if metrics_file else "")
+                + "."
+            )
+        if repeat:
+            log(f"⏱️  Loading each URL {repeat} time(s), {cache} cache.")
+        elif duration is None:
+            log("Press Ctrl+C to stop.")
+
+        browser = await browser_type.launch(headless=headless)
+        slots = asyncio.Semaphore(concurrency)
+        tagged = len(urls) > 1
+        sink = ConsoleSink(matcher, buffering, queue_size, tag_rules, dedup, limiter)
+        sink.start()
+        results = {url: [] for url in urls}
         try:
-            await asyncio.Future()
-        except asyncio.CancelledError:
-            pass
+            if repeat:
+                # One URL at a time, so loads don't compete with each other
+                for url in urls:
+                    await benchmark_page(
+                        browser,
+                        url,
+                        sink,
+                        repeat,
+                        results[url],
+                        cache,
+                        duration,
+                        f"[{url}] " if tagged else "",
+                        init_script,
+                        recorder,
+                    )
+                loaded = [any(results[url]) for url in urls]
+            else:
+                loaded = await asyncio.gather(
+                    *(
+                        watch_page(
+                            browser,
+                            url,
+                            sink,
+                            slots,
+                            duration,
+                            f"[{url}] " if tagged else "",
+                            init_script,
+                            recorder,
+                        )
+                        for url in urls
+                    )
+                )
         finally:
             await browser.close()
+            sink.close()
+            if sink.dropped:
+                log(f"⚠️  {sink.dropped} console message(s) dropped in all.")
+            if init_script:
+                log(f"🧹 {sink.prefiltered} console call(s) filtered in the page.")
+            if dedup and dedup.collapsed:
+                log(f"🔁 {dedup.collapsed} repeated message(s) collapsed.")
+            if limiter and limiter.limited:
+                log(
+                    f"🚦 {sum(limiter.limited.values())} message(s) held back "
+                    "by the rate limits."
+                )
+            if recorder:
+                recorder.report()
+            if tag_rules:
+                log("📊 Hits per rule:")
+                for name in dict.fromkeys(matcher.names):
+                    print(f"   {sink.hits[name]:>8}  {name}")
+            if repeat:
+                for url in urls:
+                    if results[url]:
+                        print_benchmark(url, results[url], cache)
+
+    failed = loaded.count(False)
+    if tagged:
+        log(
+            f"✅ {len(urls) - failed}/{len(urls)} URL(s) "
+            f"{'loaded' if repeat else 'watched'}."
+        )
+    if failed == len(urls):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -81,16 +1112,204 @@ if __name__ == "__main__":
         choices=["chromium", "chrome", "firefox", "webkit", "safari"],
         help="Browser to use",
     )
-    parser.add_argument("--at", required=True, help="Target URL")
-    parser.add_argument("--filter", required=True, help="Regex to filter logs")
+    parser.add_argument(
+        "--at",
+        action="append",
+        default=[],
+        help="Target URL (repeat to watch several pages)",
+    )
+    parser.add_argument(
+        "--urls",
+        metavar="FILE",
+        help="File with more target URLs, one per line ('#' starts a comment)",
+    )
+    parser.add_argument(
+        "--filter",
+        action="append",
+        default=[],
+        metavar="REGEX",
+        help="Regex to filter logs, taken as is (repeat to keep messages "
+        "matching any of them; use --rule to name one)",
+    )
+    parser.add_argument(
+        "--rule",
+        action="append",
+        default=[],
+        metavar="NAME=REGEX",
+        help="Named filter: lines it matches are tagged [NAME] and its hits "
+        "are counted at the end (repeatable)",
+    )
+    parser.add_argument(
+        "--rules",
+        metavar="FILE",
+        help="File with more named filters, one NAME=REGEX per line ('#' at "
+        "the start of a line makes it a comment)",
+    )
+    parser.add_argument(
+        "--headless", action="store_true", help="Run the browser without a window"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Pages open at the same time (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=None,
+        help="Seconds to watch each page after it loads, then move on to the "
+        "next URL (default: until Ctrl+C)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        metavar="N",
+        help="Benchmark: load each URL N times, timing the load event and "
+        "network idle and counting matching errors and warnings, then print "
+        "their distribution (--duration: seconds to stay after network idle)",
+    )
+    parser.add_argument(
+        "--cache",
+        choices=("cold", "warm"),
+        help="With --repeat, give every load a fresh context (cold, default) "
+        "or share one after a first uncounted load (warm)",
+    )
+    parser.add_argument(
+        "--prefilter",
+        action="store_true",
+        help="Drop console calls that can't match inside the page, before "
+        "they are sent over the protocol (checks literal text the filter "
+        "requires; calls with object arguments are always sent)",
+    )
+    parser.add_argument(
+        "--dedup",
+        type=float,
+        metavar="SECONDS",
+        help="Print a repeated message once per SECONDS window, followed by a "
+        "'(repeated ×N in Xs)' summary",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        action="append",
+        default=[],
+        metavar="[TYPE=]N",
+        help="Print at most N messages per second of a console type (log, "
+        "warning, error...), or of every type without its own limit; repeat "
+        "for several types",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Record request timings, Navigation Timing and, on Chromium, "
+        "Performance.getMetrics samples; p50/p95 are printed at the end",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="FILE",
+        help="Also write every metrics record to FILE as JSON lines "
+        "(implies --metrics)",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=METRICS_INTERVAL,
+        metavar="SECONDS",
+        help=f"Seconds between Performance.getMetrics samples (default: "
+        f"{METRICS_INTERVAL:g})",
+    )
+    parser.add_argument(
+        "--buffering",
+        choices=BUFFERING_MODES,
+        default="line",
+        help="Flush output after every batch of lines (line, default) or "
+        f"every {FLUSH_INTERVAL:g}s through a larger buffer (block)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=SINK_QUEUE_SIZE,
+        help="Console messages allowed to wait for output; more are dropped "
+        f"and counted (default: {SINK_QUEUE_SIZE})",
+    )
     parser.add_argument(
         "--version", action="version", version=f"%(prog)s {__version__}"
     )
 
     args = parser.parse_args()
+    urls = list(args.at)
+    if args.urls:
+        try:
+            urls += read_url_file(args.urls)
+        except OSError as e:
+            parser.error(f"--urls: {e}")
+    urls = list(dict.fromkeys(urls))  # drop duplicates, keep order
+    if not urls:
+        parser.error("give a target URL with --at or --urls")
+    rules = [(None, regex) for regex in args.filter]
+    try:
+        rules += [parse_rule(text) for text in args.rule]
+    except ValueError as e:
+        parser.error(f"--rule: {e}")
+    if args.rules:
+        try:
+            rules += read_rules_file(args.rules)
+        except (OSError, ValueError) as e:
+            parser.error(f"--rules: {e}")
+    if not rules:
+        parser.error("give a filter with --filter, --rule or --rules")
+    names = [name for name, _ in rules if name]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        parser.error(f"rule names used more than once: {', '.join(duplicates)}")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.queue_size < 1:
+        parser.error("--queue-size must be at least 1")
+    if args.dedup is not None and args.dedup <= 0:
+        parser.error("--dedup must be positive")
+    rate_limits = {}
+    for text in args.rate_limit:
+        try:
+            kind, rate = parse_rate_limit(text)
+        except ValueError as e:
+            parser.error(f"--rate-limit: {e}")
+        rate_limits[kind] = rate
+    if args.metrics_interval <= 0:
+        parser.error("--metrics-interval must be positive")
+    if args.duration is not None and args.duration < 0:
+        parser.error("--duration can't be negative")
+    if args.repeat is not None and args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if args.cache and not args.repeat:
+        parser.error("--cache only applies with --repeat")
+    if not args.repeat and args.duration is None and len(urls) > args.concurrency:
+        parser.error(
+            f"watching {len(urls)} URLs until Ctrl+C needs --concurrency "
+            f"{len(urls)}, or give a --duration to sweep through them"
+        )
 
     try:
-        asyncio.run(run(args.browser, args.at, args.filter))
+        asyncio.run(
+            run(
+                args.browser,
+                urls,
+                rules,
+                args.headless,
+                args.concurrency,
+                args.duration,
+                args.buffering,
+                args.queue_size,
+                args.prefilter,
+                args.dedup,
+                rate_limits,
+                args.metrics,
+                args.metrics_file,
+                args.metrics_interval,
+                args.repeat,
+                args.cache or "cold",
+            )
+        )
     except KeyboardInterrupt:
         log("👋 Stopping.")
         sys.exit(0)
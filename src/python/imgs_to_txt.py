@@ -1,70 +1,1961 @@
 import os
 import argparse
+import ctypes
+import ctypes.util
+import difflib
+import hashlib
+import html
+import json
+import queue
+import re
+import select
+import sqlite3
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from PIL import Image
 import pytesseract
 
+from stage_times import StageTimes, profiled, save_stats
+
 __version__ = "1.0.0"
 
+ENGINES = ("cli", "batch", "api")
+# Everything pdf_to_imgs writes, rendered (--fmt) or extracted (--extract)
+IMAGE_EXTENSIONS = (
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".tif",
+    ".tiff",
+    ".pnm",
+    ".pam",
+    ".bmp",
+    ".jp2",
+    ".jpx",
+)
+MULTI_FRAME_EXTENSIONS = (".tif", ".tiff")
+OUTPUT_FORMATS = ("txt", "tsv", "hocr", "json", "jsonl")
+# Tesseract outputs each --format is built from, all from one recognition
+TESSERACT_OUTPUTS = {
+    "txt": ("txt",),
+    "tsv": ("txt", "tsv"),
+    "hocr": ("txt", "hocr"),
+    "json": ("txt", "tsv"),
+    "jsonl": ("txt", "tsv"),
+}
+TSV_HEADER = (
+    "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num"
+    "\tleft\ttop\twidth\theight\tconf\ttext"
+)
+HOCR_HEAD = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"
+    "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">
+ <head>
+  <title></title>
+  <meta http-equiv="Content-Type" content="text/html;charset=utf-8"/>
+  <meta name="ocr-system" content="tesseract"/>
+  <meta name="ocr-capabilities" content="ocr_page ocr_carea ocr_par ocr_line ocrx_word ocrp_wconf"/>
+ </head>
+ <body>
+"""
+HOCR_TAIL = " </body>\n</html>\n"
+OUTPUT_HEADERS = {"tsv": TSV_HEADER + "\n", "hocr": HOCR_HEAD, "json": "[\n"}
+OUTPUT_FOOTERS = {"hocr": HOCR_TAIL, "json": "\n]\n"}
+OUTPUT_SEPARATORS = {"txt": "\n", "json": ",\n"}
+CACHE_FILE = "ocr.sqlite3"
+DEFAULT_CACHE_SIZE = 512  # MB
+QUEUED_PAGES_PER_JOB = 2  # default --queue-size, per OCR job
+BATCH_FILL_TIMEOUT = 0.05  # seconds an OCR worker waits to grow a batch
+
 
 def log(msg):
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+    # Single write per line so messages from OCR threads don't interleave
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}\n", end="")
 
 
-def run_ocr_to_txt(input_dir, lang="eng"):
-    if not os.path.isdir(input_dir):
-        log(f"Directory {input_dir} does not exist.")
+def _limit_tesseract_threads(jobs):
+    """Share the CPUs between `jobs` concurrent Tesseract processes.
+
+    Each Tesseract process starts its own OpenMP team sized to the machine,
+    so N parallel processes would oversubscribe the CPU N times over. An
+    OMP_THREAD_LIMIT already set by the user is left alone.
+    """
+    if "OMP_THREAD_LIMIT" not in os.environ:
+        threads = max(1, (os.cpu_count() or 1) // jobs)
+        os.environ["OMP_THREAD_LIMIT"] = str(threads)
+    return os.environ["OMP_THREAD_LIMIT"]
+
+
+# ---------------------------------------------------------------------------
+# OCR engines
+#
+# Every engine takes a list of pages (image paths or PIL images) and returns,
+# in the same order, one {output: data} dict per page for each of its
+# `outputs` ("txt", "tsv", "hocr"), all from a single recognition. `batch_size`
+# is how many pages it wants per call, `version()` identifies the Tesseract
+# build for the result cache.
+# ---------------------------------------------------------------------------
+
+
+class CliEngine:
+    """One `tesseract` process per page, through pytesseract."""
+
+    batch_size = 1
+
+    def __init__(self, lang, outputs=("txt",)):
+        self.lang = lang
+        self.outputs = outputs
+
+    def recognize(self, pages):
+        results = []
+        for page in pages:
+            # Files go to tesseract by path; only frames and images are encoded
+            image, owned = (page, False) if isinstance(page, str) else _load_page(page)
+            try:
+                if self.outputs == ("txt",):
+                    results.append(
+                        {"txt": pytesseract.image_to_string(image, lang=self.lang)}
+                    )
+                    continue
+                data = pytesseract.run_and_get_multiple_output(
+                    image, list(self.outputs), lang=self.lang
+                )
+            finally:
+                if owned:
+                    image.close()
+            result = {
+                output: value.decode("utf-8") if isinstance(value, bytes) else value
+                for output, value in zip(self.outputs, data)
+            }
+            if "hocr" in result:
+                # Keep only the page div, like the other engines
+                result["hocr"] = _split_hocr(result["hocr"])[0]
+            results.append(result)
+        return results
+
+    def version(self):
+        return str(pytesseract.get_tesseract_version())
+
+    def close(self):
+        pass
+
+
+class BatchEngine:
+    """One `tesseract` process per batch of pages, fed through a list file.
+
+    The language model is loaded once per batch instead of once per page,
+    and image files are passed by path, so they are not re-encoded. Pages
+    come back separated by form feeds.
+    """
+
+    def __init__(self, lang, batch_size=16, outputs=("txt",)):
+        self.lang = lang
+        self.batch_size = batch_size
+        self.outputs = outputs
+
+    def recognize(self, pages):
+        with tempfile.TemporaryDirectory(prefix="imgstotxt_") as tmp_dir:
+            paths = []
+            for number, page in enumerate(pages):
+                if isinstance(page, str):
+                    paths.append(os.path.abspath(page))
+                    continue
+                path = os.path.join(tmp_dir, f"page_{number:04d}.png")
+                image, owned = _load_page(page)
+                try:
+                    image.save(path, compress_level=1)
+                finally:
+                    if owned:
+                        image.close()
+                paths.append(path)
+            list_file = os.path.join(tmp_dir, "pages.txt")
+            with open(list_file, "w", encoding="utf-8") as f:
+                f.write("\n".join(paths) + "\n")
+
+            output_base = os.path.join(tmp_dir, "out")
+            subprocess.run(
+                [pytesseract.pytesseract.tesseract_cmd, list_file, output_base]
+                + ["-l", self.lang]
+                + list(self.outputs),
+                capture_output=True,
+                check=True,
+            )
+            data = {}
+            for output in self.outputs:
+                with open(f"{output_base}.{output}", encoding="utf-8") as f:
+                    data[output] = f.read()
+
+        split = {
+            "txt": lambda text: text.split("\f")[: len(pages)],
+            "tsv": lambda tsv: _split_tsv(tsv, len(pages)),
+            "hocr": _split_hocr,
+        }
+        per_output = {output: split[output](data[output]) for output in self.outputs}
+        for output, values in per_output.items():
+            if len(values) != len(pages):
+                raise RuntimeError(
+                    f"tesseract returned {len(values)} {output} page(s) "
+                    f"for {len(pages)} images"
+                )
+        return [
+            {output: per_output[output][number] for output in self.outputs}
+            for number in range(len(pages))
+        ]
+
+    def version(self):
+        return str(pytesseract.get_tesseract_version())
+
+    def close(self):
+        pass
+
+
+class ApiEngine:
+    """Persistent in-process Tesseract (tesserocr), one instance per thread."""
+
+    batch_size = 1
+
+    def __init__(self, lang, outputs=("txt",)):
+        import tesserocr
+
+        self._tesserocr = tesserocr
+        self.lang = lang
+        self.outputs = outputs
+        self._local = threading.local()
+        self._apis = []
+        self._lock = threading.Lock()
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = self._tesserocr.PyTessBaseAPI(lang=self.lang)
+            self._local.api = api
+            with self._lock:
+                self._apis.append(api)
+        return api
+
+    def recognize(self, pages):
+        api = self._api()
+        results = []
+        for page in pages:
+            if isinstance(page, str):
+                api.SetImageFile(page)
+            else:
+                image, owned = _load_page(page)
+                api.SetImage(image)
+                if owned:
+                    image.close()
+            # GetUTF8Text() runs the recognition, the others reuse it
+            result = {"txt": api.GetUTF8Text()}
+            if "tsv" in self.outputs:
+                result["tsv"] = api.GetTSVText(0)
+            if "hocr" in self.outputs:
+                result["hocr"] = api.GetHOCRText(0)
+            results.append(result)
+        return results
+
+    def version(self):
+        return self._tesserocr.tesseract_version().splitlines()[0]
+
+    def close(self):
+        for api in self._apis:
+            api.End()
+
+
+def make_engine(name, lang, batch_size=16, outputs=("txt",)):
+    """Create the OCR engine `name`, falling back to "batch" without tesserocr."""
+    if name == "api":
+        try:
+            return ApiEngine(lang, outputs)
+        except ImportError:
+            log("tesserocr is not installed, falling back to the batch engine.")
+            name = "batch"
+    if name == "batch":
+        return BatchEngine(lang, batch_size, outputs)
+    return CliEngine(lang, outputs)
+
+
+def _tsv_rows(tsv):
+    """Tesseract TSV as lists of 12 columns, without the header line."""
+    rows = []
+    for line in tsv.splitlines():
+        if not line or line.startswith("level\t"):
+            continue
+        columns = line.split("\t")
+        rows.append(columns + [""] * (12 - len(columns)))
+    return rows
+
+
+def _split_tsv(tsv, count):
+    """Split multi-page TSV into one TSV per page, using the page_num column."""
+    pages = [[TSV_HEADER] for _ in range(count)]
+    for row in _tsv_rows(tsv):
+        page_num = int(row[1])
+        if 1 <= page_num <= count:
+            pages[page_num - 1].append("\t".join(row))
+    return ["\n".join(rows) + "\n" for rows in pages]
+
+
+def _split_hocr(document):
+    """The `ocr_page` divs of an hOCR document, one string per page."""
+    starts = [m.start() for m in re.finditer(r"<div class=.ocr_page.", document)]
+    end = document.rfind("</body>")
+    bounds = starts[1:] + [end if end > 0 else len(document)]
+    return [document[start:stop] for start, stop in zip(starts, bounds)]
+
+
+# ---------------------------------------------------------------------------
+# OCR result cache
+# ---------------------------------------------------------------------------
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "imgs_to_txt")
+
+
+class OcrCache:
+    """Persistent OCR results, keyed by image content.
+
+    The key is a SHA-256 of the image bytes salted with the language, the
+    Tesseract version and the OCR settings (e.g. preprocessing), so changing
+    any of them never returns stale text. Entries are evicted
+    least-recently-used first once the texts stored exceed `max_bytes`. Only
+    the main thread touches the database.
+    """
+
+    def __init__(self, path, max_bytes, lang, version, config="txt", outputs=("txt",)):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.outputs = outputs
+        self._salt = f"{version}\0{lang}\0{config}\0".encode()
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ocr ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.hits = self.misses = self.evicted = 0
+        self._last_file = None  # ((path, size, mtime), digest) of the last file
+
+    def key_for_file(self, path, frame=None):
+        """Key of an image file, or of one frame of a multi-page file.
+
+        The frames of a file are looked up one after the other, so the file
+        is hashed once for all of them.
+        """
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            identity = (path, stat.st_size, stat.st_mtime_ns)
+            if self._last_file and self._last_file[0] == identity:
+                digest = self._last_file[1].copy()
+            else:
+                digest = hashlib.sha256(self._salt)
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+                self._last_file = (identity, digest.copy())
+        if frame is not None:
+            digest.update(f"\0frame {frame}".encode())
+        return digest.hexdigest()
+
+    def key_for_image(self, image):
+        digest = hashlib.sha256(self._salt)
+        digest.update(f"{image.mode}:{image.size}\0".encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        row = self._db.execute("SELECT text FROM ocr WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._db.execute(
+            "UPDATE ocr SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        if self.outputs == ("txt",):
+            return {"txt": row[0]}
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        # Plain text is stored as is, several outputs as a JSON object
+        value = result["txt"] if self.outputs == ("txt",) else json.dumps(result)
+        self._db.execute(
+            "INSERT OR REPLACE INTO ocr VALUES (?, ?, ?, ?)",
+            (key, value, len(value.encode("utf-8")), time.time()),
+        )
+        # Committed per page so an interrupted run keeps what it OCRed
+        self._db.commit()
+
+    def _evict(self):
+        total = 0
+        stale = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM ocr ORDER BY last_used DESC"
+        ):
+            total += size
+            if total > self.max_bytes:
+                stale.append((key,))
+        self._db.executemany("DELETE FROM ocr WHERE key = ?", stale)
+        self.evicted += len(stale)
+
+    def stats(self):
+        entries, size = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr"
+        ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        self._evict()
+        self._db.commit()
+        stats = self.stats()
+        lookups = self.hits + self.misses
+        rate = 100 * self.hits / lookups if lookups else 0
+        log(
+            f"Cache: {self.hits} hit(s), {self.misses} miss(es) ({rate:.0f}% hits), "
+            f"{stats['entries']} entries, {stats['bytes'] / 1e6:.1f} MB, "
+            f"{self.evicted} evicted"
+        )
+        self._db.close()
+
+
+def open_cache(
+    engine,
+    lang,
+    cache_dir=None,
+    cache_size=DEFAULT_CACHE_SIZE,
+    preprocess=(),
+    target_dpi=300,
+):
+    """Open the OCR cache for `engine`, or return None if it is unusable."""
+    path = os.path.join(cache_dir or default_cache_dir(), CACHE_FILE)
+    config = "+".join(engine.outputs)
+    if preprocess:
+        config += f";preprocess={','.join(preprocess)};target_dpi={target_dpi}"
+    try:
+        return OcrCache(
+            path,
+            cache_size * 1_000_000,
+            lang,
+            engine.version(),
+            config,
+            engine.outputs,
+        )
+    except Exception as e:
+        log(f"OCR cache disabled ({path}): {e}")
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Preprocessing
+#
+# Optional clean-up done on NumPy arrays in the OCR threads, before the page
+# reaches Tesseract. Steps always run in PREPROCESS_STEPS order.
+# ---------------------------------------------------------------------------
+
+PREPROCESS_STEPS = ("downscale", "gray", "crop", "deskew", "threshold")
+BENCHMARK_PROFILES = [
+    ("none", ()),
+    ("gray", ("gray",)),
+    ("downscale", ("downscale", "gray")),
+    ("crop", ("gray", "crop")),
+    ("deskew", ("gray", "deskew")),
+    ("threshold", ("gray", "threshold")),
+    ("all", PREPROCESS_STEPS),
+]
+BENCHMARK_PAGES = 3
+
+
+def parse_preprocess(spec):
+    """Turn "gray,deskew" / "all" / "none" into a tuple of steps in run order."""
+    names = {s.strip() for s in spec.lower().split(",") if s.strip()}
+    if names <= {"none"}:
+        return ()
+    if "all" in names:
+        return PREPROCESS_STEPS
+    unknown = names - set(PREPROCESS_STEPS)
+    if unknown:
+        raise ValueError(f"unknown preprocessing step(s): {', '.join(sorted(unknown))}")
+    return tuple(step for step in PREPROCESS_STEPS if step in names)
+
+
+def _adaptive_threshold(a, window, offset=10):
+    """Binarize `a` against the mean of the `window` x `window` box around each pixel.
+
+    Box sums come from an integral image. It is accumulated in uint32 and
+    allowed to wrap: the differences are taken modulo 2**32 too, and a single
+    box sum always fits, so the result is exact for any page size.
+    """
+    import numpy as np
+
+    pad = window // 2
+    integral = np.zeros((a.shape[0] + 2 * pad + 1, a.shape[1] + 2 * pad + 1), np.uint32)
+    padded = np.pad(a, pad, mode="edge").astype(np.uint32)
+    np.cumsum(padded, axis=0, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+    h, w = a.shape
+    box = (
+        integral[window : window + h, window : window + w]
+        - integral[:h, window : window + w]
+        - integral[window : window + h, :w]
+        + integral[:h, :w]
+    )
+    mean = box.astype(np.float32) / (window * window)
+    return np.where(a.astype(np.float32) > mean - offset, 255, 0).astype(np.uint8)
+
+
+def _skew_angle(a, max_angle=5.0):
+    """Estimate the text skew of `a` in degrees from its row projection profile.
+
+    Dark pixels (subsampled) are sheared by each candidate angle and binned
+    per row; text lines give the sharpest profile at the right angle. A
+    coarse pass is refined around its best angle.
+    """
+    import numpy as np
+
+    step = max(1, min(a.shape) // 800)
+    ys, xs = np.nonzero(a[::step, ::step] < 128)
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > 200_000:
+        keep = slice(None, None, len(ys) // 200_000 + 1)
+        ys, xs = ys[keep], xs[keep]
+
+    def sharpness(angle):
+        rows = np.round(ys - xs * np.tan(np.radians(angle))).astype(np.int64)
+        profile = np.bincount(rows - rows.min()).astype(np.int64)
+        return np.sum(np.diff(profile) ** 2)
+
+    best = 0.0
+    for resolution, span in ((0.5, max_angle), (0.1, 0.5)):
+        angles = np.arange(best - span, best + span + resolution / 2, resolution)
+        best = float(max(angles, key=sharpness))
+    return best
+
+
+def _content_box(a, margin):
+    """Bounding box of the ink in `a`, ignoring dark scanner borders."""
+    import numpy as np
+
+    ink = a < 128
+    # Rows/columns that are mostly dark are scanner edges, not content, and
+    # must not count as ink in the other direction either
+    border_rows = ink.mean(axis=1) > 0.5
+    border_cols = ink.mean(axis=0) > 0.5
+    rows = ink[:, ~border_cols].mean(axis=1) if not border_cols.all() else 0
+    cols = ink[~border_rows].mean(axis=0) if not border_rows.all() else 0
+    rows_with_text = np.nonzero((rows > 0.001) & ~border_rows)[0]
+    cols_with_text = np.nonzero((cols > 0.001) & ~border_cols)[0]
+    if not len(rows_with_text) or not len(cols_with_text):
+        return None
+    h, w = a.shape
+    return (
+        max(0, int(cols_with_text[0]) - margin),
+        max(0, int(rows_with_text[0]) - margin),
+        min(w, int(cols_with_text[-1]) + margin + 1),
+        min(h, int(rows_with_text[-1]) + margin + 1),
+    )
+
+
+def preprocess_image(image, steps, target_dpi=300):
+    """Return `image` cleaned up for OCR by `steps` (see PREPROCESS_STEPS).
+
+    "downscale" needs the image's DPI (from its metadata); images without
+    one are left at their size. Any of crop/deskew/threshold implies gray.
+    """
+    import numpy as np
+
+    dpi = image.info.get("dpi", (0, 0))[0] or None
+    if "downscale" in steps and dpi and dpi > target_dpi * 1.1:
+        scale = target_dpi / dpi
+        size = (round(image.width * scale), round(image.height * scale))
+        image = image.resize(size, Image.Resampling.BOX)
+        dpi = target_dpi
+    if not set(steps) & {"gray", "crop", "deskew", "threshold"}:
+        return image
+
+    a = np.asarray(image.convert("L"))
+    ppi = round(dpi) if dpi else 300
+    if "crop" in steps:
+        box = _content_box(a, margin=ppi // 10)
+        if box:
+            a = a[box[1] : box[3], box[0] : box[2]]
+    if "deskew" in steps:
+        angle = _skew_angle(a)
+        if abs(angle) >= 0.1:
+            rotated = Image.fromarray(a).rotate(
+                angle, resample=Image.Resampling.BILINEAR, expand=True, fillcolor=255
+            )
+            a = np.asarray(rotated)
+    if "threshold" in steps:
+        a = _adaptive_threshold(a, window=max(3, ppi // 10) | 1)
+
+    result = Image.fromarray(a)
+    if dpi:
+        result.info["dpi"] = (dpi, dpi)
+    return result
+
+
+def _ocr_batch(engine, names, pages, preprocess=(), target_dpi=300):
+    """Recognize `pages`; returns (results, timings), one {stage: seconds} per page.
+
+    Engines decode pages themselves, so decode and preprocess times are
+    measured as each page is loaded and the rest of the batch time is OCR.
+    """
+    if len(names) == 1:
+        log(f"Performing OCR on {names[0]} ...")
+    else:
+        log(f"Performing OCR on {names[0]} .. {names[-1]} ({len(names)} pages) ...")
+    timings = [{} for _ in pages]
+    pages = [
+        page
+        if isinstance(page, str) and not preprocess
+        else _LazyPage(page, preprocess, target_dpi, timing)
+        for page, timing in zip(pages, timings)
+    ]
+    started = time.perf_counter()
+    results = engine.recognize(pages)
+    elapsed = time.perf_counter() - started
+    ocr_time = (elapsed - sum(sum(t.values()) for t in timings)) / len(pages)
+    for timing in timings:
+        timing["ocr"] = ocr_time
+    return results, timings
+
+
+class _LazyPage:
+    """A page that is decoded (and preprocessed) only when an engine loads it,
+    so a batch never holds more than the page being recognized."""
+
+    def __init__(self, page, steps, target_dpi, timing):
+        self.page = page
+        self.steps = steps
+        self.target_dpi = target_dpi
+        self.timing = timing
+
+    def load(self):
+        started = time.perf_counter()
+        image, owned = _load_page(self.page)
+        if owned:
+            self.timing["decode"] = time.perf_counter() - started
+        if not self.steps:
+            return image
+        started = time.perf_counter()
+        result = preprocess_image(image, self.steps, self.target_dpi)
+        self.timing["preprocess"] = time.perf_counter() - started
+        if owned and result is not image:
+            image.close()
+        return result
+
+
+def _open_image(path):
+    if path.lower().endswith(".pam"):
+        return _read_pam(path)
+    with Image.open(path) as image:
+        image.load()
+        return image
+
+
+PAM_MODES = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}  # by DEPTH
+
+
+def _read_pam(path):
+    """Decode an 8-bit PAM (P7) file, which Pillow can't open."""
+    with open(path, "rb") as f:
+        data = f.read()
+    end = data.find(b"ENDHDR\n")
+    if not data.startswith(b"P7\n") or end < 0:
+        raise OSError(f"not a PAM file: {path}")
+    header = dict(
+        line.split(None, 1)
+        for line in data[3:end].decode("ascii").splitlines()
+        if line.strip() and not line.startswith("#")
+    )
+    depth = int(header.get("DEPTH", 0))
+    if header.get("MAXVAL") != "255" or depth not in PAM_MODES:
+        raise OSError(f"unsupported PAM file (8-bit, depth 1-4 only): {path}")
+    size = int(header["WIDTH"]), int(header["HEIGHT"])
+    return Image.frombytes(PAM_MODES[depth], size, data[end + 7 :])
+
+
+def _load_page(page):
+    """Decode an engine page: a file path, a lazy page (with `load()`) or an image.
+
+    Returns (image, owned). Owned images were decoded here, and the engine
+    closes them as soon as they are recognized to free their pixels.
+    """
+    if isinstance(page, Image.Image):
+        return page, False
+    if isinstance(page, str):
+        return _open_image(page), True
+    return page.load(), True
+
+
+def _word_accuracy(reference, text):
+    return difflib.SequenceMatcher(None, reference.split(), text.split()).ratio()
+
+
+def _benchmark_samples(input_path, dpi, min_chars):
+    """First BENCHMARK_PAGES pages of `input_path` as (name, image, reference).
+
+    The reference text is the PDF text layer, or a tesstrain-style
+    `<image stem>.gt.txt` next to an image; None when there is neither.
+    """
+    samples = []
+    if input_path.lower().endswith(".pdf"):
+        import fitz  # pymupdf
+        from pdf_to_imgs import iter_page_images
+
+        with fitz.open(input_path) as doc:
+            count = min(BENCHMARK_PAGES, len(doc))
+            for number, image in iter_page_images(
+                doc, dpi, pages=list(range(1, count + 1)), output="pil"
+            ):
+                image.info["dpi"] = (dpi, dpi)
+                reference = _text_layer(doc[number - 1], min_chars)
+                samples.append((f"page {number}", image, reference))
+        return samples
+
+    for page in _list_pages(input_path)[:BENCHMARK_PAGES]:
+        reference = None
+        gt_path = os.path.splitext(page.path)[0] + ".gt.txt"
+        if page.frame is None and os.path.exists(gt_path):
+            with open(gt_path, encoding="utf-8") as f:
+                reference = f.read()
+        samples.append((page.label, page.load(), reference))
+    return samples
+
+
+def benchmark_preprocessing(
+    input_path, lang="eng", dpi=300, target_dpi=300, min_chars=50, engine="cli"
+):
+    """Print preprocessing time, OCR time and accuracy for each profile.
+
+    Accuracy is the word-level similarity to the reference text (see
+    _benchmark_samples), so it is only shown when the samples have one.
+    """
+    samples = _benchmark_samples(input_path, dpi, min_chars)
+    if not samples:
+        log("No pages to benchmark.")
         return
+    has_reference = any(reference for _, _, reference in samples)
+    ocr = make_engine(engine, lang)
+    log(f"⏱️  OCR of {len(samples)} page(s) of {os.path.basename(input_path)}")
+    if not has_reference:
+        log("No text layer or .gt.txt files, accuracy can't be measured.")
+    print(
+        f"{'Profile':<12} {'prep ms':>9} {'OCR ms':>9} {'pages/s':>9} {'accuracy':>9}"
+    )
+    for label, steps in BENCHMARK_PROFILES:
+        prep_time = ocr_time = 0.0
+        scores = []
+        for _, image, reference in samples:
+            started = time.perf_counter()
+            page = preprocess_image(image, steps, target_dpi) if steps else image
+            prepared = time.perf_counter()
+            text = ocr.recognize([page])[0]["txt"]
+            prep_time += prepared - started
+            ocr_time += time.perf_counter() - prepared
+            if reference:
+                scores.append(_word_accuracy(reference, text))
+        accuracy = f"{100 * sum(scores) / len(scores):.1f}%" if scores else "-"
+        print(
+            f"{label:<12} {prep_time * 1000 / len(samples):>9.0f} "
+            f"{ocr_time * 1000 / len(samples):>9.0f} "
+            f"{len(samples) / (prep_time + ocr_time):>9.2f} {accuracy:>9}"
+        )
+    ocr.close()
+
+
+def _chunks(items, size):
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+# ---------------------------------------------------------------------------
+# Streaming output
+# ---------------------------------------------------------------------------
+
+
+class PageWriter:
+    """Write pages to `output_path` in page order, as soon as they are ready.
+
+    OCR finishes out of order, so pages wait in a reorder buffer until every
+    page before them is written. Output goes to `<output>.part`, which
+    replaces the output only once complete; `<output>.progress.json` records
+    how much of the .part file is safely on disk, so --resume can carry on
+    from there after a crash.
+
+    `fmt` is one of OUTPUT_FORMATS; pages are the {output: data} dicts the
+    engines return. jsonl lines are flushed one by one for tailing readers.
+    """
+
+    SAVE_INTERVAL = 1.0  # seconds between progress records
+
+    def __init__(
+        self, output_path, source, labels, resume=False, fmt="txt", times=None
+    ):
+        self.output_path = output_path
+        self.part_path = output_path + ".part"
+        self.progress_path = output_path + ".progress.json"
+        self.labels = labels
+        self.fmt = fmt
+        self.times = times
+        self.next_index = 1
+        self._source = self._fingerprint(source)
+        self._buffer = {}
+        self._saved_at = 0.0
+        header = OUTPUT_HEADERS.get(fmt, "").encode("utf-8")
+        self._header_size = len(header)
+        offset = self._resume_offset() if resume else 0
+        self._file = open(self.part_path, "r+b" if offset else "wb")
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        if not offset:
+            self._file.write(header)
+        self._offset = offset or len(header)
+
+    @staticmethod
+    def _fingerprint(source):
+        info = {"path": os.path.abspath(source)}
+        if os.path.isfile(source):
+            stat = os.stat(source)
+            info.update(size=stat.st_size, mtime=stat.st_mtime)
+        return info
+
+    def _resume_offset(self):
+        try:
+            with open(self.progress_path, encoding="utf-8") as f:
+                progress = json.load(f)
+            done = progress["next"] - 1
+            if (
+                progress["source"] != self._source
+                or progress.get("format", "txt") != self.fmt
+                or not 0 < done <= len(self.labels)
+                or progress["last"] != self.labels[done - 1]
+                or os.path.getsize(self.part_path) < progress["offset"]
+            ):
+                log("Progress record doesn't match the input, starting over.")
+                return 0
+        except FileNotFoundError:
+            log("Nothing to resume, starting from the first page.")
+            return 0
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log(f"Unreadable progress record ({e}), starting over.")
+            return 0
+        self.next_index = progress["next"]
+        log(f"Resuming after page {done} ({self.labels[done - 1]}).")
+        return progress["offset"]
+
+    def _save_progress(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        progress = {
+            "source": self._source,
+            "format": self.fmt,
+            "next": self.next_index,
+            "last": self.labels[self.next_index - 2],
+            "offset": self._offset,
+        }
+        tmp_path = self.progress_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(progress, f)
+        os.replace(tmp_path, self.progress_path)
+        self._saved_at = time.monotonic()
+
+    def add(self, index, result, source=None):
+        """Queue page `index` (None if it failed) and write whatever is ready.
+
+        `source` tells where a PDF page's text came from ("text" layer or
+        "ocr"); it goes in the page header, or the record for json/jsonl.
+        """
+        self._buffer[index] = (result, source)
+        if self.next_index not in self._buffer:
+            return
+        while self.next_index in self._buffer:
+            result, source = self._buffer.pop(self.next_index)
+            if result is not None:
+                label = self.labels[self.next_index - 1]
+                first = self._offset == self._header_size
+                started = time.perf_counter()
+                data = _page_chunk(
+                    self.fmt, self.next_index, label, result, source, first
+                )
+                encoded = time.perf_counter()
+                self._file.write(data)
+                self._offset += len(data)
+                if self.times:
+                    self.times.add("encode", encoded - started)
+                    self.times.add("write", time.perf_counter() - encoded)
+            self.next_index += 1
+        if self.fmt == "jsonl":
+            self._file.flush()
+        if time.monotonic() - self._saved_at >= self.SAVE_INTERVAL:
+            self._save_progress()
+
+    def finish(self):
+        if self._buffer:
+            raise RuntimeError(f"pages {sorted(self._buffer)} were never written")
+        self._file.write(OUTPUT_FOOTERS.get(self.fmt, "").encode("utf-8"))
+        self._file.close()
+        os.replace(self.part_path, self.output_path)
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+        log(f"✅ OCR complete. Output saved to: {self.output_path}")
+
+    def abort(self):
+        """Keep the .part file and record progress for a later --resume."""
+        if self.next_index > 1:
+            self._save_progress()
+        self._file.close()
+        log(f"Partial output kept in {self.part_path}, re-run with --resume.")
+
+
+def _render_page(fmt, index, label, result, source=None):
+    """Page `index` of the combined output, in `fmt`."""
+    if fmt == "txt":
+        if source:
+            label += f" [{source}]"
+        return f"\n\n===== Page {index} : {label} =====\n\n{result['txt'].strip()}"
+    if fmt == "tsv":
+        rows = _tsv_rows(result["tsv"])
+        return "".join("\t".join([r[0], str(index)] + r[2:]) + "\n" for r in rows)
+    if fmt == "hocr":
+        return _renumber_hocr(result["hocr"], index, label)
+    record = {"page": index, "file": label}
+    if source:
+        record["source"] = source
+    # Tesseract's CLI ends each page with a form feed; BatchEngine splits on it
+    record["text"] = result["txt"].rstrip("\f")
+    record["words"] = _tsv_words(result["tsv"])
+    return json.dumps(record, ensure_ascii=False)
+
+
+def _page_chunk(fmt, index, label, result, source=None, first=False):
+    """Encoded page, with the separator it needs after the previous one."""
+    chunk = _render_page(fmt, index, label, result, source)
+    if not first:
+        chunk = OUTPUT_SEPARATORS.get(fmt, "") + chunk
+    if fmt == "jsonl":
+        chunk += "\n"
+    return chunk.encode("utf-8")
+
+
+def _tsv_words(tsv):
+    """Word boxes and confidences from Tesseract TSV, for json/jsonl output."""
+    words = []
+    for row in _tsv_rows(tsv):
+        if row[0] != "5" or not row[11].strip():
+            continue
+        left, top, width, height = (int(v) for v in row[6:10])
+        words.append(
+            {
+                "text": row[11],
+                "conf": float(row[10]),
+                "left": left,
+                "top": top,
+                "width": width,
+                "height": height,
+                "block": int(row[2]),
+                "par": int(row[3]),
+                "line": int(row[4]),
+            }
+        )
+    return words
+
+
+def _renumber_hocr(fragment, index, label):
+    """Make a single-page hOCR fragment page `index` of the combined document."""
+    fragment = re.sub(r"id='([a-z]+)_\d+", rf"id='\g<1>_{index}", fragment)
+    fragment = re.sub(r"ppageno \d+", f"ppageno {index - 1}", fragment)
+    fragment = re.sub(
+        r'image "[^"]*"', lambda _: f'image "{html.escape(label)}"', fragment
+    )
+    return fragment.rstrip() + "\n"
+
 
-    images = sorted(
-        [
-            f
-            for f in os.listdir(input_dir)
-            if f.lower().endswith((".png", ".jpg", ".jpeg"))
+def _text_layer_result(page, text, dpi, outputs):
+    """Engine-style result for a PDF page taken from its text layer.
+
+    Word boxes come from PyMuPDF, scaled to pixels at `dpi` so they line up
+    with OCRed pages. Their confidence is 100.
+    """
+    result = {"txt": text}
+    if outputs == ("txt",):
+        return result
+    scale = dpi / 72
+    # Same pixel size as the page rendered at `dpi`
+    pixels = (page.rect * scale).irect
+    width, height = pixels.width, pixels.height
+    words = []
+    for x0, y0, x1, y1, word, block, line, number in page.get_text("words"):
+        box = [
+            round(x0 * scale),
+            round(y0 * scale),
+            round(x1 * scale),
+            round(y1 * scale),
+        ]
+        words.append((box, word, block + 1, line + 1, number + 1))
+    if "tsv" in outputs:
+        rows = [TSV_HEADER, f"1\t1\t0\t0\t0\t0\t0\t0\t{width}\t{height}\t-1\t"]
+        for (left, top, right, bottom), word, block, line, number in words:
+            rows.append(
+                f"5\t1\t{block}\t1\t{line}\t{number}\t{left}\t{top}"
+                f"\t{right - left}\t{bottom - top}\t100\t{word}"
+            )
+        result["tsv"] = "\n".join(rows) + "\n"
+    if "hocr" in outputs:
+        spans = [
+            f"   <span class='ocrx_word' id='word_1_{n}' title='bbox "
+            f"{' '.join(map(str, box))}; x_wconf 100'>{html.escape(word)}</span>"
+            for n, (box, word, _, _, _) in enumerate(words, 1)
         ]
+        result["hocr"] = (
+            f"  <div class='ocr_page' id='page_1' title='image \"\"; "
+            f"bbox 0 0 {width} {height}; ppageno 0'>\n"
+            + "\n".join(spans)
+            + "\n  </div>\n"
+        )
+    return result
+
+
+def _text_layer(page, min_chars):
+    """Return the page's own text if it has at least `min_chars` letters/digits."""
+    text = page.get_text("text")
+    if sum(c.isalnum() for c in text) >= min_chars:
+        return text
+    return None
+
+
+def run_pdf_to_txt(
+    pdf_path,
+    lang="eng",
+    dpi=300,
+    min_chars=50,
+    jobs=None,
+    engine="cli",
+    batch_size=16,
+    cache=True,
+    cache_dir=None,
+    cache_size=DEFAULT_CACHE_SIZE,
+    resume=False,
+    preprocess=(),
+    target_dpi=300,
+    fmt="txt",
+    queue_size=None,
+):
+    """OCR a PDF, reusing the embedded text layer wherever a page has one.
+
+    Only pages without enough real text are rasterized (in memory) and sent
+    to Tesseract, unless the OCR cache already knows the rendered page.
+    At most `queue_size` rendered pages (default: 2 per job, and at least
+    one engine batch) are alive at once, waiting for or in OCR, which caps
+    memory. The output formats and the returned timing report match
+    run_ocr_to_txt().
+    """
+    import fitz  # pymupdf
+    from pdf_to_imgs import iter_page_images
+
+    output_path = os.path.splitext(pdf_path)[0] + "." + fmt
+    pdf_name = os.path.basename(pdf_path)
+
+    try:
+        doc = fitz.open(pdf_path)
+    except Exception as e:
+        log(f"Error opening {pdf_name}: {e}")
+        return
+
+    jobs = jobs or os.cpu_count() or 1
+    log(f"{len(doc)} page(s) found in {pdf_name}.")
+    if jobs > 1:
+        threads = _limit_tesseract_threads(jobs)
+        log(f"Running {jobs} OCR jobs (OMP_THREAD_LIMIT={threads})")
+    times = StageTimes()
+    writer = PageWriter(
+        output_path, pdf_path, [pdf_name] * len(doc), resume, fmt, times
+    )
+    first_index = writer.next_index
+    outputs = TESSERACT_OUTPUTS[fmt]
+    ocr = make_engine(engine, lang, batch_size, outputs)
+    store = (
+        open_cache(ocr, lang, cache_dir, cache_size, preprocess, target_dpi)
+        if cache
+        else None
     )
+    # Rendering (here) and OCR (worker threads) overlap. Pages handed to the
+    # workers count until their batch comes back, and the renderer waits
+    # for one when `queue_size` of them are out.
+    queue_size = queue_size or max(jobs * QUEUED_PAGES_PER_JOB, ocr.batch_size)
+    todo = queue.Queue()  # (index, image, cache key)
+    done = queue.Queue()  # (pages, results, timings, error) per batch
+    rendered, cancelled = threading.Event(), threading.Event()
+    workers = [
+        threading.Thread(
+            target=_ocr_worker,
+            args=(ocr, todo, done, rendered, cancelled, preprocess, target_dpi),
+            daemon=True,
+        )
+        for _ in range(jobs)
+    ]
+    queued = 0  # pages handed to the workers whose results are not back
+    from_layer = ocred = 0
+
+    def collect(block=False):
+        """Write every finished batch, waiting for the first one if `block`."""
+        nonlocal queued
+        while queued:
+            try:
+                # Short waits keep Ctrl+C prompt
+                pages, results, timings, error = done.get(block, 0.1)
+            except queue.Empty:
+                if block:
+                    continue
+                return
+            block = False
+            if error:
+                indexes = ", ".join(str(index) for index, _ in pages)
+                log(f"Error processing page(s) {indexes}: {error}")
+            for timing in timings:
+                times.add_all(timing)
+            for (index, key), result in zip(pages, results):
+                if store and result is not None:
+                    store.put(key, result)
+                writer.add(index, result, "ocr")
+            queued -= len(pages)
+
+    def enqueue(item):
+        nonlocal queued
+        todo.put(item)
+        queued += 1
+        collect()
+
+    for worker in workers:
+        worker.start()
+    try:
+        with doc:
+            for index, page in enumerate(doc, 1):
+                if index < writer.next_index:
+                    continue
+                try:
+                    with times.stage("text"):
+                        text = _text_layer(page, min_chars)
+                        if text is not None:
+                            result = _text_layer_result(page, text, dpi, outputs)
+                    if text is not None:
+                        log(f"Using text layer of page {index} ...")
+                        writer.add(index, result, "text")
+                        from_layer += 1
+                        continue
+                    with times.stage("queue"):
+                        while queued >= queue_size:
+                            collect(block=True)
+                    with times.stage("render"):
+                        _, image = next(
+                            iter_page_images(
+                                doc, dpi, colorspace="gray", pages=[index], output="pil"
+                            )
+                        )
+                    image.info["dpi"] = (dpi, dpi)
+                    ocred += 1
+                    key = result = None
+                    if store:
+                        with times.stage("cache"):
+                            key = store.key_for_image(image)
+                            result = store.get(key)
+                    if result is not None:
+                        writer.add(index, result, "ocr")
+                        continue
+                    enqueue((index, image, key))
+                except Exception as e:
+                    log(f"Error processing page {index}: {e}")
+                    writer.add(index, None)
+        rendered.set()
+        while queued:
+            collect(block=True)
+    except BaseException:
+        # Queued pages are dropped; batches already in Tesseract finish
+        cancelled.set()
+        writer.abort()
+        raise
+    finally:
+        rendered.set()
+        for worker in workers:
+            worker.join()
+        ocr.close()
+        if store:
+            store.close()
 
-    if not images:
+    log(f"{from_layer} page(s) taken from the text layer, {ocred} OCRed.")
+    writer.finish()
+    return times.report(writer.next_index - first_index)
+
+
+def _ocr_worker(ocr, todo, done, rendered, cancelled, preprocess, target_dpi):
+    """OCR rendered pages from the `todo` queue, a batch at a time.
+
+    A batch starts with the first page to come, takes up to the engine's
+    batch size of pages already waiting, and goes to Tesseract once the
+    queue stays dry for BATCH_FILL_TIMEOUT. Results go to `done`, one tuple
+    per batch. The worker returns when the queue is drained after `rendered`
+    is set, or at once if `cancelled`.
+    """
+    while not cancelled.is_set():
+        batch = []
+        while len(batch) < ocr.batch_size and not cancelled.is_set():
+            try:
+                batch.append(todo.get(timeout=BATCH_FILL_TIMEOUT if batch else 0.1))
+            except queue.Empty:
+                if batch or rendered.is_set():
+                    break
+        if not batch or cancelled.is_set():
+            return
+        pages = [(index, key) for index, _, key in batch]
+        images = [image for _, image, _ in batch]
+        names = [f"page {index}" for index, _ in pages]
+        try:
+            results, timings = _ocr_batch(ocr, names, images, preprocess, target_dpi)
+            done.put((pages, results, timings, None))
+        except Exception as e:
+            done.put((pages, [None] * len(pages), [], e))
+
+
+def _list_images(input_dir):
+    return sorted(
+        f for f in os.listdir(input_dir) if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+class ImagePage:
+    """One page of an image file: the whole file, or one frame of a multi-page TIFF.
+
+    Nothing is decoded until `load()`, which reads just that frame and
+    closes the file again, so pages can be listed for any number of files.
+    """
+
+    __slots__ = ("path", "frame", "label")
+
+    def __init__(self, path, frame=None, frames=1):
+        self.path = path
+        self.frame = frame
+        name = os.path.basename(path)
+        self.label = name if frame is None else f"{name} [{frame + 1}/{frames}]"
+
+    @property
+    def source(self):
+        """What the engines get: the file itself when it is a single page."""
+        return self.path if self.frame is None else self
+
+    def load(self):
+        with Image.open(self.path) as image:
+            if self.frame:
+                image.seek(self.frame)
+            image.load()
+            return image
+
+
+def _image_pages(path):
+    """The pages of one image file: one per frame for multi-page TIFFs."""
+    frames = 1
+    if path.lower().endswith(MULTI_FRAME_EXTENSIONS):
+        try:
+            # Counting frames walks the TIFF directories without decoding them
+            with Image.open(path) as image:
+                frames = getattr(image, "n_frames", 1)
+        except OSError:
+            pass  # reported when the page is OCRed
+    if frames == 1:
+        return [ImagePage(path)]
+    return [ImagePage(path, frame, frames) for frame in range(frames)]
+
+
+def _list_pages(input_dir):
+    return [
+        page
+        for name in _list_images(input_dir)
+        for page in _image_pages(os.path.join(input_dir, name))
+    ]
+
+
+def _folder_output_path(input_dir, fmt):
+    """`<folder>.<fmt>` next to the folder."""
+    return os.path.join(
+        os.path.dirname(input_dir),
+        os.path.basename(input_dir.rstrip("/\\")) + "." + fmt,
+    )
+
+
+def _ocr_images(
+    numbered, ocr, store, jobs, preprocess, target_dpi, on_result, times=None
+):
+    """OCR the (index, ImagePage) pairs in `numbered`, cache first.
+
+    `on_result(index, result)` is called in the calling thread as each page
+    completes, in no particular order; result is None if OCR failed. Pages
+    are only decoded by the OCR workers, one at a time each. Stage timings
+    go to `times` (a StageTimes) when given.
+    """
+    missing = []  # (index, page, cache key)
+    for index, page in numbered:
+        key = result = None
+        if store:
+            started = time.perf_counter()
+            try:
+                key = store.key_for_file(page.path, page.frame)
+                result = store.get(key)
+            except OSError:
+                pass
+            if times:
+                times.add("cache", time.perf_counter() - started)
+        if result is None:
+            missing.append((index, page, key))
+        else:
+            on_result(index, result)
+    if store:
+        log(f"{len(numbered) - len(missing)} page(s) found in the OCR cache.")
+    if not missing:
+        return
+
+    batches = _chunks(missing, ocr.batch_size)
+    jobs = min(jobs or os.cpu_count() or 1, len(batches))
+    if jobs > 1:
+        threads = _limit_tesseract_threads(jobs)
+        log(f"Running {jobs} OCR jobs (OMP_THREAD_LIMIT={threads})")
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(
+                _ocr_batch,
+                ocr,
+                [page.label for _, page, _ in batch],
+                [page.source for _, page, _ in batch],
+                preprocess,
+                target_dpi,
+            ): batch
+            for batch in batches
+        }
+        try:
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when="FIRST_COMPLETED")
+                for future in done:
+                    batch = futures[future]
+                    try:
+                        results, timings = future.result()
+                    except Exception as e:
+                        names = ", ".join(page.label for _, page, _ in batch)
+                        log(f"Error processing {names}: {e}")
+                        results, timings = [None] * len(batch), []
+                    if times:
+                        for timing in timings:
+                            times.add_all(timing)
+                    for (index, _, key), result in zip(batch, results):
+                        if store and key and result is not None:
+                            store.put(key, result)
+                        on_result(index, result)
+        except BaseException:
+            # Queued batches are dropped; batches already in Tesseract finish
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+def run_ocr_to_txt(
+    input_dir,
+    lang="eng",
+    dpi=300,
+    min_chars=50,
+    jobs=None,
+    engine="cli",
+    batch_size=16,
+    cache=True,
+    cache_dir=None,
+    cache_size=DEFAULT_CACHE_SIZE,
+    resume=False,
+    preprocess=(),
+    target_dpi=300,
+    fmt="txt",
+    queue_size=None,
+):
+    """OCR a folder of images (or a PDF) into a single file with page breaks.
+
+    `fmt` is one of OUTPUT_FORMATS: plain text with page headers, Tesseract
+    TSV or hOCR for all pages, or a JSON array / JSON lines with each page's
+    text and word boxes. Every format comes from one recognition per page.
+
+    Returns a timing report (see StageTimes.report) for --stats.
+    """
+    if os.path.isfile(input_dir) and input_dir.lower().endswith(".pdf"):
+        return run_pdf_to_txt(
+            input_dir,
+            lang,
+            dpi,
+            min_chars,
+            jobs,
+            engine,
+            batch_size,
+            cache,
+            cache_dir,
+            cache_size,
+            resume,
+            preprocess,
+            target_dpi,
+            fmt,
+            queue_size,
+        )
+
+    if not os.path.isdir(input_dir):
+        log(f"Directory {input_dir} does not exist.")
+        return
+
+    pages = _list_pages(input_dir)
+
+    if not pages:
         log("No image files found in the directory.")
         return
 
-    output_txt = os.path.join(
-        os.path.dirname(input_dir), os.path.basename(input_dir.rstrip("/\\")) + ".txt"
+    output_path = _folder_output_path(input_dir, fmt)
+
+    files = len({page.path for page in pages})
+    if files == len(pages):
+        log(f"{files} image(s) found for OCR.")
+    else:
+        log(f"{files} image(s) found for OCR, {len(pages)} pages in all.")
+    # Stages timed for --stats: cache (hashing and lookup), decode,
+    # preprocess, ocr, encode (formatting the output) and write; PDFs add
+    # text (reading the text layer), queue (waiting for room under
+    # --queue-size) and render. OCR workers hand their timings back with
+    # the results; only this thread records them.
+    times = StageTimes()
+    writer = PageWriter(
+        output_path, input_dir, [page.label for page in pages], resume, fmt, times
     )
+    ocr = make_engine(engine, lang, batch_size, TESSERACT_OUTPUTS[fmt])
+    store = (
+        open_cache(ocr, lang, cache_dir, cache_size, preprocess, target_dpi)
+        if cache
+        else None
+    )
+    # Pages are numbered in sorted order, whatever order OCR finishes in
+    numbered = list(enumerate(pages, 1))[writer.next_index - 1 :]
+    try:
+        _ocr_images(
+            numbered,
+            ocr,
+            store,
+            jobs,
+            preprocess,
+            target_dpi,
+            writer.add,
+            times,
+        )
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        ocr.close()
+        if store:
+            store.close()
+
+    writer.finish()
+    return times.report(len(numbered))
+
 
-    log(f"{len(images)} image(s) found for OCR.")
-    all_text = []
+# ---------------------------------------------------------------------------
+# Watch mode
+# ---------------------------------------------------------------------------
 
-    for index, img_file in enumerate(images, 1):
-        img_path = os.path.join(input_dir, img_file)
+POLL_INTERVAL = 1.0  # seconds between directory scans without inotify
+
+
+class InotifyWatcher:
+    """Names of files created, written, moved or deleted in a directory.
+
+    Uses Linux inotify through libc, so nothing is rescanned between events.
+    """
+
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    EVENT_FMT = "iIII"  # wd, mask, cookie, name length
+
+    def __init__(self, path):
+        self.path = path
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = (
+            self.IN_MODIFY
+            | self.IN_CLOSE_WRITE
+            | self.IN_MOVED_FROM
+            | self.IN_MOVED_TO
+            | self.IN_CREATE
+            | self.IN_DELETE
+        )
+        if libc.inotify_add_watch(self._fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed on {path}")
+
+    def changes(self, timeout):
+        """File names touched within `timeout` seconds (possibly none)."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
         try:
-            log(f"Performing OCR on {img_file} ...")
-            text = pytesseract.image_to_string(Image.open(img_path), lang=lang)
-            all_text.append(
-                f"\n\n===== Page {index} : {img_file} =====\n\n{text.strip()}"
-            )
-        except Exception as e:
-            log(f"Error processing {img_file}: {e}")
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names = set()
+        header = struct.calcsize(self.EVENT_FMT)
+        offset = 0
+        while offset + header <= len(data):
+            _, mask, _, length = struct.unpack_from(self.EVENT_FMT, data, offset)
+            name = data[offset + header : offset + header + length].rstrip(b"\0")
+            offset += header + length
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were dropped: look at everything again
+                names.update(os.listdir(self.path))
+            elif name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self._fd)
 
+
+class PollingWatcher:
+    """Same as InotifyWatcher, by comparing directory listings."""
+
+    def __init__(self, path, interval=POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._seen = self._scan()
+
+    def _scan(self):
+        entries = {}
+        for entry in os.scandir(self.path):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return entries
+
+    def changes(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        current = self._scan()
+        changed = {
+            name
+            for name in current.keys() | self._seen.keys()
+            if current.get(name) != self._seen.get(name)
+        }
+        self._seen = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def _make_watcher(path, poll=False):
+    if not poll:
+        try:
+            watcher = InotifyWatcher(path)
+            log("Watching with inotify.")
+            return watcher
+        except (OSError, AttributeError, TypeError) as e:
+            log(f"inotify unavailable ({e}), polling instead.")
+    log(f"Polling every {POLL_INTERVAL:g}s.")
+    return PollingWatcher(path)
+
+
+def _signature(path):
     try:
-        with open(output_txt, "w", encoding="utf-8") as f:
-            f.write("\n".join(all_text))
-        log(f"✅ OCR complete. Output saved to: {output_txt}")
-    except Exception as e:
-        log(f"Error writing output file: {e}")
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class LiveOutput:
+    """A combined output file that is updated in place as pages change.
+
+    Byte offsets of every page are kept, so an update truncates the file at
+    the first changed page and rewrites only from there; pages appended at
+    the end (the usual case for a scanner) cost just their own write.
+    """
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        header = OUTPUT_HEADERS.get(fmt, "").encode("utf-8")
+        self._header_size = len(header)
+        self._starts = []  # offset of each page, including its separator
+        self._end = self._header_size
+        self._file = open(path, "wb")
+        self._file.write(header)
+
+    def update(self, names, results, start=0):
+        """Rewrite pages from position `start` of `names` (sorted) onwards."""
+        start = min(start, len(self._starts))
+        offset = self._starts[start] if start < len(self._starts) else self._end
+        del self._starts[start:]
+        self._file.seek(offset)
+        self._file.truncate()
+        for position in range(start, len(names)):
+            self._starts.append(offset)
+            result = results.get(names[position])
+            if result is not None:
+                first = offset == self._header_size
+                data = _page_chunk(
+                    self.fmt, position + 1, names[position], result, first=first
+                )
+                self._file.write(data)
+                offset += len(data)
+        self._end = offset
+        self._file.write(OUTPUT_FOOTERS.get(self.fmt, "").encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def watch_folder(
+    input_dir,
+    lang="eng",
+    jobs=None,
+    engine="cli",
+    batch_size=16,
+    cache=True,
+    cache_dir=None,
+    cache_size=DEFAULT_CACHE_SIZE,
+    preprocess=(),
+    target_dpi=300,
+    fmt="txt",
+    settle=2.0,
+    poll=False,
+):
+    """OCR a folder, then keep its combined output current until Ctrl+C.
+
+    New or modified images are OCRed once their size and mtime have not
+    changed for `settle` seconds, so files still being written by a scanner
+    are left alone. Deleted images drop out of the output. Results stay in
+    memory, so only the changed pages are ever OCRed again.
+    """
+    output_path = _folder_output_path(input_dir, fmt)
+    ocr = make_engine(engine, lang, batch_size, TESSERACT_OUTPUTS[fmt])
+    store = (
+        open_cache(ocr, lang, cache_dir, cache_size, preprocess, target_dpi)
+        if cache
+        else None
+    )
+    output = LiveOutput(output_path, fmt)
+    pages = {}  # image name -> its ImagePages
+    results = {}  # page label -> result (None if OCR failed)
+    signatures = {}  # image name -> (size, mtime) of the OCRed version
+    pending = {}  # image name -> (signature, when it last changed)
+
+    def ordered():
+        return [page for name in sorted(pages) for page in pages[name]]
+
+    def ocr_files(names):
+        new_pages = []
+        for name in names:
+            pages[name] = _image_pages(os.path.join(input_dir, name))
+            new_pages.extend(pages[name])
+        _ocr_images(
+            list(enumerate(new_pages, 1)),
+            ocr,
+            store,
+            jobs,
+            preprocess,
+            target_dpi,
+            lambda index, result: results.__setitem__(
+                new_pages[index - 1].label, result
+            ),
+        )
+
+    watcher = _make_watcher(input_dir, poll)
+    try:
+        images = _list_images(input_dir)
+        for name in images:
+            signatures[name] = _signature(os.path.join(input_dir, name))
+        log(f"{len(images)} image(s) found for OCR.")
+        ocr_files(images)
+        output.update([page.label for page in ordered()], results)
+        log(f"✅ Output saved to: {output_path}")
+        log(f"👀 Watching {input_dir} for new images. Press Ctrl+C to stop.")
+
+        while True:
+            changed = watcher.changes(timeout=settle / 2)
+            now = time.monotonic()
+            for name in changed:
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    pending[name] = (None, now)
+
+            ready, removed = [], []
+            for name, (signature, since) in list(pending.items()):
+                current = _signature(os.path.join(input_dir, name))
+                if current is None:
+                    del pending[name]
+                    if name in pages:
+                        removed.append(name)
+                elif current != signature:
+                    pending[name] = (current, now)  # still being written
+                elif now - since >= settle:
+                    del pending[name]
+                    if current != signatures.get(name):
+                        signatures[name] = current
+                        ready.append(name)
+            if not ready and not removed:
+                continue
+
+            touched = set(ready) | set(removed)
+            old_order = ordered()
+            # A changed file may have gained or lost frames: drop all its pages
+            for name in touched:
+                for page in pages.pop(name, []):
+                    results.pop(page.label, None)
+            for name in removed:
+                del signatures[name]
+            if ready:
+                ocr_files(sorted(ready))
+            order = ordered()
+            first = min(
+                position
+                for pages_in in (old_order, order)
+                for position, page in enumerate(pages_in)
+                if os.path.basename(page.path) in touched
+            )
+            output.update([page.label for page in order], results, first)
+            log(
+                f"✅ {len(ready)} new/changed, {len(removed)} removed image(s), "
+                f"output rewritten from page {first + 1} of {len(order)}."
+            )
+    except KeyboardInterrupt:
+        log("👋 Watch stopped.")
+    finally:
+        watcher.close()
+        output.close()
+        ocr.close()
+        if store:
+            store.close()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
-        description="Performs OCR on a folder of image files and outputs a single .txt file with page breaks."
+        description="Performs OCR on a folder of image files (or a PDF) and outputs a single .txt file with page breaks."
+    )
+    parser.add_argument(
+        "input_dir", help="Path to the folder containing images, or to a PDF file"
     )
-    parser.add_argument("input_dir", help="Path to the folder containing images")
     parser.add_argument(
         "--lang", default="eng", help="Tesseract OCR language (e.g., eng, fra, deu...)"
     )
+    parser.add_argument(
+        "--dpi",
+        type=int,
+        default=300,
+        help="Rendering resolution for PDF pages that need OCR (default: 300)",
+    )
+    parser.add_argument(
+        "--min-text-chars",
+        type=int,
+        default=50,
+        help="Letters/digits a PDF page's text layer needs to skip OCR (default: 50)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of pages OCRed in parallel (default: CPU count)",
+    )
+    parser.add_argument(
+        "--engine",
+        default="cli",
+        choices=ENGINES,
+        help="cli: one tesseract run per page; batch: one run per --batch-size "
+        "pages (model loaded once); api: persistent tesserocr instance "
+        "(default: cli)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=16,
+        help="Pages per tesseract run with --engine batch (default: 16)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=None,
+        help="Rendered PDF pages kept at once, waiting for or in OCR; "
+        f"rendering pauses at the limit (default: {QUEUED_PAGES_PER_JOB} per "
+        "job, and at least --batch-size with --engine batch)",
+    )
+    parser.add_argument(
+        "--format",
+        default="txt",
+        choices=OUTPUT_FORMATS,
+        help="Output file format: plain text, Tesseract TSV or hOCR, or JSON / "
+        "JSON lines with word boxes and confidences (default: txt)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Don't read or update the OCR result cache",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="OCR cache location (default: $XDG_CACHE_HOME/imgs_to_txt)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help=f"OCR cache size limit in MB (default: {DEFAULT_CACHE_SIZE})",
+    )
+    parser.add_argument(
+        "--preprocess",
+        default="none",
+        metavar="STEPS",
+        help="Comma-separated clean-up before OCR: "
+        f"{', '.join(PREPROCESS_STEPS)}, or all/none (default: none)",
+    )
+    parser.add_argument(
+        "--target-dpi",
+        type=int,
+        default=300,
+        help="Resolution the downscale step reduces images to (default: 300)",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help=f"Time OCR of the first {BENCHMARK_PAGES} pages with each "
+        "preprocessing profile and exit",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After the first pass, keep OCRing images as they arrive in the "
+        "folder and update the output in place (Ctrl+C to stop)",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=2.0,
+        help="With --watch, seconds a file must stay unchanged before it is "
+        "OCRed (default: 2)",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="With --watch, poll the folder instead of using inotify "
+        "(e.g. for network filesystems)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from the last page written",
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="FILE",
+        default=None,
+        help="Write per-stage timings (totals, p50/p95/p99, pages/s) to FILE as JSON",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        default=None,
+        help="Dump cProfile stats of the run to FILE (main thread only, "
+        "use --jobs 1 to include OCR)",
+    )
     parser.add_argument(
         "--version", action="version", version=f"%(prog)s {__version__}"
     )
 
     args = parser.parse_args()
-    run_ocr_to_txt(args.input_dir, args.lang)
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.cache_size < 1:
+        parser.error("--cache-size must be at least 1")
+    if args.queue_size is not None and args.queue_size < 1:
+        parser.error("--queue-size must be at least 1")
+    try:
+        preprocess = parse_preprocess(args.preprocess)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.watch and not os.path.isdir(args.input_dir):
+        parser.error("--watch needs a folder of images")
+    if args.watch and args.resume:
+        parser.error("--watch always rebuilds the output, drop --resume")
+    if (args.stats or args.profile) and (args.watch or args.benchmark):
+        parser.error("--stats and --profile only apply to a normal run")
+    if args.benchmark:
+        benchmark_preprocessing(
+            args.input_dir,
+            args.lang,
+            args.dpi,
+            args.target_dpi,
+            args.min_text_chars,
+            args.engine,
+        )
+        raise SystemExit(0)
+    if args.watch:
+        watch_folder(
+            args.input_dir,
+            args.lang,
+            args.jobs,
+            args.engine,
+            args.batch_size,
+            args.cache,
+            args.cache_dir,
+            args.cache_size,
+            preprocess,
+            args.target_dpi,
+            args.format,
+            args.settle,
+            args.poll,
+        )
+        raise SystemExit(0)
+    report = profiled(
+        args.profile,
+        run_ocr_to_txt,
+        args.input_dir,
+        args.lang,
+        args.dpi,
+        args.min_text_chars,
+        args.jobs,
+        args.engine,
+        args.batch_size,
+        args.cache,
+        args.cache_dir,
+        args.cache_size,
+        args.resume,
+        preprocess,
+        args.target_dpi,
+        args.format,
+        args.queue_size,
+    )
+    if args.stats and report:
+        save_stats({"settings": vars(args), **report}, args.stats)
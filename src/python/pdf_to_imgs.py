@@ -1,22 +1,508 @@
 import argparse
-from pathlib import Path
+import glob
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import re
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from pathlib import Path
 
 import fitz  # pymupdf
 
+from stage_times import StageTimes, profiled, save_stats
+
 __version__ = "1.0.0"
 
+MANIFEST_NAME = ".manifest.json"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Documents opened by a worker process, least recently used first
+_worker_docs = OrderedDict()
+WORKER_DOC_CACHE = 4
+
 
 def log(message):
     time = datetime.now().strftime("%H:%M:%S")
     print(f"[{time}] {message}")
 
 
-def pdf_to_images(pdf_path, dpi=300, fmt="png"):
-    pdf_path = Path(pdf_path).resolve()
+def parse_size(text):
+    """Parse a byte size such as "512M", "2G" or "1048576"."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?\s*", text, re.I)
+    if not match:
+        raise ValueError(f"invalid size '{text}'")
+    scale = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30}[match[2].lower()]
+    return int(float(match[1]) * scale)
+
+
+# ---------------------------------------------------------------------------
+# Page selection
+# ---------------------------------------------------------------------------
+
+
+def parse_page_ranges(spec, page_count):
+    """Parse a selection like "10-50,72" into a sorted list of page numbers.
+
+    Pages are 1-based; open ranges ("-5", "40-") run to the first/last page.
+    Raises ValueError on malformed input or pages outside the document.
+    """
+    pages = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        try:
+            first = int(start) if start.strip() else 1
+            last = int(end) if end.strip() else page_count
+            if not sep:
+                last = first
+        except ValueError:
+            raise ValueError(f"invalid page range '{part}'") from None
+        if first < 1 or last > page_count or first > last:
+            raise ValueError(f"page range '{part}' outside 1-{page_count}")
+        pages.update(range(first, last + 1))
+    return sorted(pages)
+
+
+# ---------------------------------------------------------------------------
+# Manifest (incremental / resumable conversion)
+# ---------------------------------------------------------------------------
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_info(pdf_path, previous):
+    """Describe the source PDF, reusing the previous hash if size/mtime match."""
+    stat = pdf_path.stat()
+    info = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if previous and all(previous.get(k) == v for k, v in info.items()):
+        info["sha256"] = previous.get("sha256")
+    else:
+        info["sha256"] = _sha256_file(pdf_path)
+    return info
+
+
+def _load_manifest(output_folder):
+    try:
+        with open(output_folder / MANIFEST_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_manifest(output_folder, manifest):
+    # Write then rename so an interrupted run never leaves a truncated manifest
+    path = output_folder / MANIFEST_NAME
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _is_up_to_date(output_folder, entry):
+    if not entry:
+        return False
+    image_path = output_folder / entry["file"]
+    try:
+        return _sha256_file(image_path) == entry["sha256"]
+    except OSError:
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+
+FORMATS = ("png", "jpeg", "jpg", "tiff", "pnm", "pam")
+# "mono" pages are rendered in gray, then thresholded to 1 bit when encoded
+COLORSPACES = {"rgb": fitz.csRGB, "gray": fitz.csGRAY, "mono": fitz.csGRAY}
+OUTPUTS = ("pixmap", "samples", "pil", "bytes")
+ENCODING_OPTIONS = ("colorspace", "alpha", "compression", "quality")
+
+
+def _to_pil(pix, colorspace="rgb"):
+    from PIL import Image
+
+    mode = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}[pix.n]
+    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    if colorspace == "mono":
+        image = image.convert("1", dither=Image.Dither.NONE)
+    return image
+
+
+TIFF_ZIPQUALITY = 65557  # libtiff pseudo-tag: deflate level, never written out
+
+
+def _tiff_options(colorspace, compression):
+    """Pillow TIFF save() options for `compression` (zlib level or None)."""
+    if colorspace == "mono":
+        return {"compression": "group4"}
+    if not compression:
+        return {"compression": "raw"}
+    return {
+        "compression": "tiff_adobe_deflate",
+        "tiffinfo": {TIFF_ZIPQUALITY: compression},
+    }
+
+
+def _encode_pixmap(pix, fmt, colorspace="rgb", compression=None, quality=None):
+    """Encode a pixmap as `fmt`; `compression` is the PNG/TIFF zlib level."""
+    if colorspace == "mono" or fmt == "tiff":
+        # MuPDF has neither a TIFF nor a 1-bit writer; go through Pillow
+        image = _to_pil(pix, colorspace)
+        buffer = io.BytesIO()
+        if fmt == "tiff":
+            image.save(buffer, "TIFF", **_tiff_options(colorspace, compression))
+        elif fmt == "png":
+            level = 6 if compression is None else compression
+            image.save(buffer, "PNG", compress_level=level)
+        else:
+            image.save(buffer, "PPM")  # PBM for 1-bit images
+        return buffer.getvalue()
+    if fmt == "png" and compression is not None:
+        buffer = io.BytesIO()
+        writer = _PngStreamWriter(buffer, pix.width, pix.height, pix.n, compression)
+        writer.write_rows(pix.samples_mv)
+        writer.close()
+        return buffer.getvalue()
+    if fmt in ("jpeg", "jpg") and quality is not None:
+        return pix.tobytes(fmt, jpg_quality=quality)
+    return pix.tobytes(fmt)
+
+
+def _convert_pixmap(pix, output, fmt, encoding):
+    if output == "pixmap":
+        return pix
+    if output == "samples":
+        return pix.width, pix.height, pix.n, pix.samples
+    if output == "pil":
+        return _to_pil(pix, encoding["colorspace"])
+    return _encode_pixmap(
+        pix,
+        fmt,
+        encoding["colorspace"],
+        encoding["compression"],
+        encoding["quality"],
+    )
+
+
+def _page_bitmap_size(page, dpi, channels):
+    """Width, height and byte size of the full-page bitmap at `dpi`."""
+    zoom = dpi / 72
+    irect = (page.rect * fitz.Matrix(zoom, zoom)).irect
+    return irect.width, irect.height, irect.width * irect.height * channels
+
+
+def _fit_dpi(page, dpi, channels, max_memory):
+    """Highest DPI (at most `dpi`) whose full-page bitmap fits in max_memory."""
+    _, _, size = _page_bitmap_size(page, dpi, channels)
+    if size > max_memory:
+        dpi = max(1, int(dpi * math.sqrt(max_memory / size)))
+        while dpi > 1 and _page_bitmap_size(page, dpi, channels)[2] > max_memory:
+            dpi -= 1
+    return dpi
+
+
+def iter_page_images(
+    source,
+    dpi=300,
+    colorspace="rgb",
+    pages=None,
+    output="pixmap",
+    fmt="png",
+    max_memory=None,
+    alpha=False,
+    compression=None,
+    quality=None,
+):
+    """Render PDF pages in memory, yielding (page_number, image) pairs.
+
+    `source` is a path or an already open fitz.Document (left open). `pages`
+    is an iterable of 1-based page numbers (default: all). `output` selects
+    what is yielded for each page:
+
+    - "pixmap": the fitz.Pixmap itself
+    - "samples": a (width, height, channels, raw_bytes) tuple
+    - "pil": a PIL.Image.Image
+    - "bytes": the page encoded as `fmt` (png, jpeg, tiff, pnm, pam)
+
+    `colorspace` is "rgb", "gray" or "mono" (1-bit, applied to the PIL and
+    encoded outputs). `compression` is the PNG/TIFF zlib level (0-9) and
+    `quality` the JPEG quality (1-100); both default to the encoder's own.
+
+    With `max_memory` (bytes), pages whose bitmap would not fit are rendered
+    at a lower DPI instead.
+    """
+    if output not in OUTPUTS:
+        raise ValueError(f"output must be one of {', '.join(OUTPUTS)}")
+    cs = COLORSPACES[colorspace]
+    encoding = {
+        "colorspace": colorspace,
+        "compression": compression,
+        "quality": quality,
+    }
+
+    owned = not isinstance(source, fitz.Document)
+    doc = fitz.open(str(source)) if owned else source
+    try:
+        if pages is None:
+            pages = range(1, len(doc) + 1)
+        for page_number in pages:
+            page = doc[page_number - 1]
+            page_dpi = dpi
+            if max_memory:
+                page_dpi = _fit_dpi(page, dpi, cs.n + alpha, max_memory)
+            pix = page.get_pixmap(dpi=page_dpi, colorspace=cs, alpha=alpha)
+            yield page_number, _convert_pixmap(pix, output, fmt, encoding)
+    finally:
+        if owned:
+            doc.close()
+
+
+# ---------------------------------------------------------------------------
+# Tiled rendering (pages larger than the memory budget)
+# ---------------------------------------------------------------------------
+
+
+class _PngStreamWriter:
+    """Minimal PNG encoder fed strip by strip, so no full bitmap is needed."""
+
+    COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}  # gray, gray+alpha, RGB, RGBA
+
+    def __init__(self, fileobj, width, height, channels, level=6):
+        self._file = fileobj
+        self._stride = width * channels
+        self._zlib = zlib.compressobj(level)
+        self.sha256 = hashlib.sha256()
+        self._write(PNG_SIGNATURE)
+        header = struct.pack(
+            ">IIBBBBB", width, height, 8, self.COLOR_TYPES[channels], 0, 0, 0
+        )
+        self._chunk(b"IHDR", header)
+
+    def _write(self, data):
+        self._file.write(data)
+        self.sha256.update(data)
+
+    def _chunk(self, kind, data):
+        crc = zlib.crc32(kind + data)
+        self._write(struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc))
+
+    def write_rows(self, samples):
+        # Every scanline starts with its filter type; 0 = no filtering
+        rows = bytearray()
+        for start in range(0, len(samples), self._stride):
+            rows += b"\x00"
+            rows += samples[start : start + self._stride]
+        data = self._zlib.compress(rows)
+        if data:
+            self._chunk(b"IDAT", data)
+
+    def close(self):
+        self._chunk(b"IDAT", self._zlib.flush())
+        self._chunk(b"IEND", b"")
+
+
+def _write_png_tiled(page, fileobj, dpi, cs, alpha, max_memory, level=6):
+    """Render `page` in full-width strips streamed into a PNG; returns sha256."""
+    zoom = dpi / 72
+    matrix = fitz.Matrix(zoom, zoom)
+    irect = (page.rect * matrix).irect
+    width, height = irect.width, irect.height
+    channels = cs.n + alpha
+    stride = width * channels
+
+    # Each strip exists twice at once: the pixmap and the filtered PNG rows
+    strip_rows = max(1, max_memory // (2 * stride))
+    writer = _PngStreamWriter(fileobj, width, height, channels, level)
+    x0, x1 = page.rect.x0, page.rect.x1
+    for y in range(0, height, strip_rows):
+        rows = min(strip_rows, height - y)
+        top, bottom = irect.y0 + y, irect.y0 + y + rows
+        clip = fitz.Rect(x0, top / zoom, x1, bottom / zoom)
+        pix = page.get_pixmap(matrix=matrix, clip=clip, colorspace=cs, alpha=alpha)
+        offset = (top - pix.y) * pix.stride
+        writer.write_rows(pix.samples_mv[offset : offset + rows * stride])
+        del pix
+    writer.close()
+    return writer.sha256.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Embedded image extraction (scanned pages)
+# ---------------------------------------------------------------------------
+
+# Embedded streams that are valid image files on their own
+EXTRACTABLE_EXTS = {"jpeg", "jpg", "jpx", "jp2", "png", "tiff", "bmp", "pnm"}
+
+
+def _embedded_page_image(doc, page):
+    """Return (ext, bytes) if the page is just one upright full-page image.
+
+    Pages with visible text, several images, a soft mask or a
+    rotated/flipped placement return None and must be rasterized; an
+    invisible OCR layer, as in searchable scans, is fine. Streams that are not
+    standalone files (JBIG2, CCITT, raw) are decoded at their native
+    resolution and stored as PNG, which is still lossless and needs no
+    page rendering.
+    """
+    images = page.get_images(full=True)
+    if len(images) != 1 or page.rotation:
+        return None
+    xref, smask = images[0][0], images[0][1]
+    if smask or _has_visible_text(page):
+        return None
+
+    placements = page.get_image_rects(xref, transform=True)
+    if len(placements) != 1:
+        return None
+    bbox, matrix = placements[0]
+    if matrix.b or matrix.c or matrix.a <= 0 or matrix.d <= 0:
+        return None
+    # Allow for small scanner margins around the image
+    if abs(bbox & page.rect) < 0.9 * abs(page.rect):
+        return None
+
+    info = doc.extract_image(xref)
+    if info and info["ext"] in EXTRACTABLE_EXTS:
+        return info["ext"], info["image"]
+    pix = fitz.Pixmap(doc, xref)
+    if pix.colorspace and pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    return "png", pix.tobytes("png")
+
+
+def _has_visible_text(page):
+    # Span type 3 is render mode 3 (invisible), used for OCR text layers
+    return any(
+        span["type"] != 3 and span.get("opacity", 1) > 0
+        for span in page.get_texttrace()
+    )
+
+
+def _render_page(doc, page_number, settings, output_folder):
+    """Render one page to disk; returns (file name, sha256, note, timing).
+
+    `timing` maps the stages the page went through (extract, render,
+    encode, write, or tiled for strip-by-strip PNGs) to seconds.
+    """
+    dpi, fmt, max_memory = settings["dpi"], settings["fmt"], settings["max_memory"]
+    encoding = {key: settings[key] for key in ENCODING_OPTIONS}
+    cs = COLORSPACES[encoding["colorspace"]]
+    channels = cs.n + encoding["alpha"]
+    image_path = Path(output_folder) / f"page_{page_number:03d}.{fmt}"
+    page = doc[page_number - 1]
+    note = ""
+    timing = {}
+
+    if settings["extract"]:
+        started = time.perf_counter()
+        embedded = _embedded_page_image(doc, page)
+        timing["extract"] = time.perf_counter() - started
+        if embedded:
+            ext, data = embedded
+            image_path = image_path.with_suffix(f".{ext}")
+            started = time.perf_counter()
+            image_path.write_bytes(data)
+            digest = hashlib.sha256(data).hexdigest()
+            timing["write"] = time.perf_counter() - started
+            return image_path.name, digest, f"extracted {ext}", timing
+
+    if max_memory and _page_bitmap_size(page, dpi, channels)[2] > max_memory:
+        if fmt == "png" and encoding["colorspace"] != "mono":
+            level = 6 if encoding["compression"] is None else encoding["compression"]
+            started = time.perf_counter()
+            with open(image_path, "wb") as f:
+                digest = _write_png_tiled(
+                    page, f, dpi, cs, encoding["alpha"], max_memory, level
+                )
+            timing["tiled"] = time.perf_counter() - started
+            return image_path.name, digest, "tiled", timing
+        # No streaming encoder for this format: shrink the page to fit instead
+        dpi = _fit_dpi(page, dpi, channels, max_memory)
+        note = f"downscaled to {dpi} DPI"
+
+    started = time.perf_counter()
+    _, pix = next(iter_page_images(doc, dpi, pages=[page_number], **encoding))
+    rendered = time.perf_counter()
+    data = _convert_pixmap(pix, "bytes", fmt, encoding)
+    encoded = time.perf_counter()
+    image_path.write_bytes(data)
+    digest = hashlib.sha256(data).hexdigest()
+    timing.update(
+        render=rendered - started,
+        encode=encoded - rendered,
+        write=time.perf_counter() - encoded,
+    )
+    return image_path.name, digest, note, timing
+
+
+def _worker_open(pdf_path):
+    """Open `pdf_path` in this worker, keeping the last few documents open."""
+    doc = _worker_docs.pop(pdf_path, None)
+    if doc is None:
+        doc = fitz.open(pdf_path)
+        if len(_worker_docs) >= WORKER_DOC_CACHE:
+            _, oldest = _worker_docs.popitem(last=False)
+            oldest.close()
+    _worker_docs[pdf_path] = doc
+    return doc
+
+
+def _render_in_worker(pdf_path, page_number, settings, output_folder):
+    doc = _worker_open(pdf_path)
+    return _render_page(doc, page_number, settings, output_folder)
+
+
+# ---------------------------------------------------------------------------
+# Conversion
+# ---------------------------------------------------------------------------
+
+
+def collect_pdfs(inputs, recursive=False):
+    """Expand files, directories and glob patterns into unique PDF paths."""
+    found = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            pattern = "**/*" if recursive else "*"
+            found += sorted(p for p in path.glob(pattern) if p.suffix.lower() == ".pdf")
+        elif any(c in str(item) for c in "*?["):
+            found += sorted(
+                Path(p)
+                for p in glob.glob(str(item), recursive=recursive)
+                if p.lower().endswith(".pdf")
+            )
+        else:
+            found.append(path)
+
+    unique = {}
+    for path in found:
+        unique.setdefault(path.resolve(), None)
+    return list(unique)
+
+
+def _plan_document(pdf_path, settings, pages, force, batch):
+    """Open the manifest of one PDF and work out which pages need rendering."""
     if not pdf_path.exists():
         log(f"❌ File not found: {pdf_path}")
-        return
+        return None
 
     # Create output directory
     output_folder = pdf_path.parent / f"{pdf_path.stem}_images"
@@ -24,44 +510,481 @@ def pdf_to_images(pdf_path, dpi=300, fmt="png"):
 
     log(f"📄 PDF loaded: {pdf_path}")
     log(f"📁 Output directory: {output_folder}")
-    log(f"🔧 Settings: DPI = {dpi}, Format = {fmt}")
 
     try:
-        log("🚀 Starting conversion of PDF to images...")
-        doc = fitz.open(str(pdf_path))
+        with fitz.open(str(pdf_path)) as doc:
+            page_count = len(doc)
     except Exception as e:
-        log(f"❌ Error during conversion: {e}")
+        log(f"❌ Error opening {pdf_path.name}: {e}")
+        return None
+
+    try:
+        selected = parse_page_ranges(pages, page_count) if pages else None
+    except ValueError as e:
+        log(f"❌ Invalid --pages for {pdf_path.name}: {e}")
+        return None
+    selected = selected or list(range(1, page_count + 1))
+
+    # Pages from a previous run are only reusable for the same source and settings
+    previous = None if force else _load_manifest(output_folder)
+    source = _source_info(pdf_path, previous and previous.get("source"))
+    if (
+        previous
+        and previous.get("source", {}).get("sha256") == source["sha256"]
+        and previous.get("settings") == settings
+    ):
+        page_entries = previous.get("pages", {})
+    else:
+        page_entries = {}
+    manifest = {"source": source, "settings": settings, "pages": page_entries}
+    _save_manifest(output_folder, manifest)
+
+    to_render = [
+        n
+        for n in selected
+        if not _is_up_to_date(output_folder, page_entries.get(str(n)))
+    ]
+    skipped = len(selected) - len(to_render)
+    if skipped:
+        log(f"⏭️  {skipped} page(s) already up to date, skipping.")
+
+    return {
+        "pdf_path": pdf_path,
+        "output_folder": output_folder,
+        "manifest": manifest,
+        "to_render": to_render,
+        "skipped": skipped,
+        "prefix": f"[{pdf_path.name}] " if batch else "",
+    }
+
+
+def _record_page(job, page_number, name, digest, note, timing, stats):
+    started = time.perf_counter()
+    job["manifest"]["pages"][str(page_number)] = {"file": name, "sha256": digest}
+    _save_manifest(job["output_folder"], job["manifest"])
+    timing["manifest"] = time.perf_counter() - started
+    stats["times"].add_all(timing)
+    stats["converted"] += 1
+    stats["bytes"] += (job["output_folder"] / name).stat().st_size
+    suffix = f" ({note})" if note else ""
+    log(f"✅ {job['prefix']}Page {page_number} saved as: {name}{suffix}")
+
+
+def _convert_sequential(jobs, settings, stats):
+    for job in jobs:
+        if not job["to_render"]:
+            continue
+        with fitz.open(str(job["pdf_path"])) as doc:
+            for page_number in job["to_render"]:
+                try:
+                    log(f"🖼️  {job['prefix']}Processing page {page_number}...")
+                    result = _render_page(
+                        doc, page_number, settings, job["output_folder"]
+                    )
+                    _record_page(job, page_number, *result, stats)
+                except Exception as e:
+                    log(f"⚠️  {job['prefix']}Error saving page {page_number}: {e}")
+
+
+def _convert_parallel(jobs, settings, stats, workers):
+    """Serve every page of every document from one shared process pool.
+
+    Pages are queued document by document, so each worker mostly keeps
+    hitting the same open document.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                _render_in_worker,
+                str(job["pdf_path"]),
+                page_number,
+                settings,
+                str(job["output_folder"]),
+            ): (job, page_number)
+            for job in jobs
+            for page_number in job["to_render"]
+        }
+        for future in as_completed(futures):
+            job, page_number = futures[future]
+            try:
+                _record_page(job, page_number, *future.result(), stats)
+            except Exception as e:
+                log(f"⚠️  {job['prefix']}Error saving page {page_number}: {e}")
+
+
+def _write_multipage_tiff(pdf_path, pages, settings):
+    """Stream the selected pages of a PDF into `<stem>.tiff`, one frame each."""
+    from PIL import TiffImagePlugin
+
+    encoding = {key: settings[key] for key in ENCODING_OPTIONS}
+    options = _tiff_options(encoding["colorspace"], encoding["compression"])
+    tiff_path = pdf_path.with_suffix(".tiff")
+    timings = []  # {stage: seconds} per frame; frames are written as encoded
+    with fitz.open(str(pdf_path)) as doc:
+        selected = parse_page_ranges(pages, len(doc)) if pages else None
+        frames = iter_page_images(
+            doc,
+            settings["dpi"],
+            pages=selected,
+            output="pil",
+            max_memory=settings["max_memory"],
+            **encoding,
+        )
+        with TiffImagePlugin.AppendingTiffWriter(str(tiff_path), True) as tiff:
+            while True:
+                started = time.perf_counter()
+                frame = next(frames, None)
+                if frame is None:
+                    break
+                rendered = time.perf_counter()
+                frame[1].save(tiff, "TIFF", **options)
+                tiff.newFrame()
+                timings.append(
+                    {
+                        "render": rendered - started,
+                        "encode": time.perf_counter() - rendered,
+                    }
+                )
+    return tiff_path, len(timings), timings
+
+
+def _convert_multipage_tiffs(pdf_paths, pages, settings, stats, workers):
+    """One multi-page TIFF per PDF; documents are spread over the pool."""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_write_multipage_tiff, pdf_path, pages, settings): pdf_path
+            for pdf_path in pdf_paths
+        }
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            try:
+                tiff_path, count, timings = future.result()
+            except Exception as e:
+                log(f"⚠️  Error converting {pdf_path.name}: {e}")
+                continue
+            for timing in timings:
+                stats["times"].add_all(timing)
+            stats["converted"] += count
+            stats["bytes"] += tiff_path.stat().st_size
+            log(f"✅ {pdf_path.name}: {count} page(s) saved as: {tiff_path.name}")
+
+
+# (label, format, colorspace, compression, quality)
+BENCHMARK_CONFIGS = [
+    ("png", "png", "rgb", None, None),
+    ("png -c 0", "png", "rgb", 0, None),
+    ("png -c 1", "png", "rgb", 1, None),
+    ("png -c 9", "png", "rgb", 9, None),
+    ("png gray", "png", "gray", None, None),
+    ("png mono", "png", "mono", None, None),
+    ("jpeg -q 75", "jpeg", "rgb", None, 75),
+    ("jpeg -q 95", "jpeg", "rgb", None, 95),
+    ("jpeg gray -q 75", "jpeg", "gray", None, 75),
+    ("tiff", "tiff", "rgb", None, None),
+    ("tiff -c 1", "tiff", "rgb", 1, None),
+    ("tiff -c 9", "tiff", "rgb", 9, None),
+    ("tiff mono (G4)", "tiff", "mono", None, None),
+    ("pnm", "pnm", "rgb", None, None),
+    ("pnm gray", "pnm", "gray", None, None),
+    ("pam", "pam", "rgb", None, None),
+]
+
+
+def benchmark_encoders(pdf_path, dpi=300, pages=None):
+    """Print encode time and output size per page for each format option.
+
+    Pages are rendered once up front, so only encoding is timed. `pages`
+    defaults to the first three.
+    """
+    with fitz.open(str(pdf_path)) as doc:
+        if pages:
+            selected = parse_page_ranges(pages, len(doc))
+        else:
+            selected = list(range(1, min(3, len(doc)) + 1))
+        pixmaps = {
+            name: [doc[n - 1].get_pixmap(dpi=dpi, colorspace=cs) for n in selected]
+            for name, cs in (("rgb", fitz.csRGB), ("gray", fitz.csGRAY))
+        }
+
+    log(f"⏱️  Encoding {len(selected)} page(s) of {Path(pdf_path).name} at {dpi} DPI")
+    print(f"{'Format':<18} {'ms/page':>10} {'KB/page':>10}")
+    for label, fmt, colorspace, compression, quality in BENCHMARK_CONFIGS:
+        source = pixmaps["rgb" if colorspace == "rgb" else "gray"]
+        size = 0
+        started = time.perf_counter()
+        for pix in source:
+            size += len(_encode_pixmap(pix, fmt, colorspace, compression, quality))
+        elapsed = time.perf_counter() - started
+        per_page_ms = elapsed * 1000 / len(source)
+        print(f"{label:<18} {per_page_ms:>10.1f} {size / len(source) / 1024:>10.0f}")
+
+
+def pdf_to_images(
+    pdf_paths,
+    dpi=300,
+    fmt="png",
+    jobs=None,
+    pages=None,
+    force=False,
+    max_memory=None,
+    extract=False,
+    recursive=False,
+    colorspace="rgb",
+    alpha=False,
+    compression=None,
+    quality=None,
+    single_tiff=False,
+):
+    """Convert one or more PDFs (files, directories or globs) into images.
+
+    Each PDF gets its own `<stem>_images/` folder and manifest, or a single
+    `<stem>.tiff` next to it with `single_tiff`. Returns a timing report
+    (see StageTimes.report) for --stats.
+    """
+    if isinstance(pdf_paths, (str, os.PathLike)):
+        pdf_paths = [pdf_paths]
+    pdf_paths = collect_pdfs(pdf_paths, recursive=recursive)
+    if not pdf_paths:
+        log("❌ No PDF files found.")
         return
+    batch = len(pdf_paths) > 1
+    workers = jobs or os.cpu_count() or 1
 
-    for i, page in enumerate(doc):
-        page_number = i + 1
-        image_path = output_folder / f"page_{page_number:03d}.{fmt}"
-        try:
-            log(f"🖼️  Processing page {page_number}...")
-            pix = page.get_pixmap(dpi=dpi)
-            pix.save(str(image_path))
-            log(f"✅ Page {page_number} saved as: {image_path.name}")
-        except Exception as e:
-            log(f"⚠️  Error saving page {page_number}: {e}")
+    log(f"🔧 Settings: DPI = {dpi}, Format = {fmt}, Jobs = {workers}")
+    if max_memory:
+        log(f"🧮 Memory budget per page: {max_memory / (1 << 20):.0f} MiB")
 
-    log(f"\n🎉 Done: {len(doc)} pages converted successfully into '{output_folder}'.")
+    settings = {
+        "dpi": dpi,
+        "fmt": fmt,
+        "max_memory": max_memory,
+        "extract": extract,
+        "colorspace": colorspace,
+        "alpha": alpha,
+        "compression": compression,
+        "quality": quality,
+    }
+
+    if single_tiff:
+        stats = {"converted": 0, "bytes": 0, "times": StageTimes()}
+        started = time.perf_counter()
+        workers = min(workers, len(pdf_paths))
+        _convert_multipage_tiffs(pdf_paths, pages, settings, stats, workers)
+        elapsed = time.perf_counter() - started
+        log(f"\n🎉 Done: {len(pdf_paths)} PDF(s) converted to multi-page TIFF.")
+        if stats["converted"]:
+            log(
+                f"📊 {elapsed:.1f}s, {stats['converted'] / elapsed:.1f} pages/s, "
+                f"{stats['bytes'] / 1e6:.1f} MB written"
+            )
+        return stats["times"].report(stats["converted"])
+
+    plans = (_plan_document(p, settings, pages, force, batch) for p in pdf_paths)
+    plans = [plan for plan in plans if plan]
+    if not plans:
+        return
+    total = sum(len(plan["to_render"]) for plan in plans)
+    skipped = sum(plan["skipped"] for plan in plans)
+    stats = {"converted": 0, "bytes": 0, "times": StageTimes()}
+
+    if batch:
+        log(f"🚀 Starting conversion of {total} page(s) from {len(plans)} PDF(s)...")
+    else:
+        log("🚀 Starting conversion of PDF to images...")
+    started = time.perf_counter()
+
+    workers = min(workers, total) or 1
+    if workers == 1:
+        _convert_sequential(plans, settings, stats)
+    else:
+        _convert_parallel(plans, settings, stats, workers)
+
+    elapsed = time.perf_counter() - started
+    converted = stats["converted"]
+    if batch:
+        log(
+            f"\n🎉 Done: {converted}/{total} pages converted successfully "
+            f"({skipped} unchanged) across {len(plans)} PDF(s)."
+        )
+    else:
+        log(
+            f"\n🎉 Done: {converted}/{total} pages converted successfully "
+            f"({skipped} unchanged) into '{plans[0]['output_folder']}'."
+        )
+    if converted:
+        log(
+            f"📊 {elapsed:.1f}s, {converted / elapsed:.1f} pages/s, "
+            f"{stats['bytes'] / 1e6:.1f} MB written"
+        )
+    return stats["times"].report(converted)
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Convert a PDF into images.")
-    parser.add_argument("pdf_path", help="Path to the PDF file to convert.")
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="Convert PDFs into images.")
+    parser.add_argument(
+        "pdf_paths",
+        nargs="+",
+        help="PDF files, directories or glob patterns to convert.",
+    )
+    parser.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="Search directories (and '**' globs) recursively.",
+    )
     parser.add_argument(
         "--dpi", type=int, default=300, help="Image resolution (default: 300)."
     )
     parser.add_argument(
         "--fmt",
-        default="png",
-        choices=["png", "jpeg", "jpg", "tiff"],
-        help="Image output format.",
+        default=None,
+        choices=FORMATS,
+        help="Image output format (default: png; pnm/pam are uncompressed).",
+    )
+    parser.add_argument(
+        "--colorspace",
+        default="rgb",
+        choices=list(COLORSPACES),
+        help="Output colors: rgb, gray or mono (1-bit) (default: rgb).",
+    )
+    parser.add_argument(
+        "--alpha",
+        action="store_true",
+        help="Keep page transparency (png, tiff, pam; off by default).",
+    )
+    parser.add_argument(
+        "--compression",
+        type=int,
+        choices=range(10),
+        metavar="0-9",
+        default=None,
+        help="PNG/TIFF zlib level: 0 = fastest/largest, 9 = smallest "
+        "(TIFF is uncompressed by default).",
+    )
+    parser.add_argument(
+        "--quality",
+        type=int,
+        default=None,
+        help="JPEG quality, 1-100.",
+    )
+    parser.add_argument(
+        "--single-tiff",
+        action="store_true",
+        help="Write one multi-page <name>.tiff per PDF instead of a folder "
+        "(always fully rewritten: no manifest, --force or --extract).",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Print encode time and size per format for the first PDF "
+        "(pages from --pages, default 1-3), then exit.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: CPU count).",
+    )
+    parser.add_argument(
+        "--pages",
+        default=None,
+        help="Pages to convert, e.g. '10-50,72' (default: all).",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the manifest and re-render every selected page.",
+    )
+    parser.add_argument(
+        "--max-memory",
+        default=None,
+        help="Per-page bitmap budget, e.g. '512M'. Larger pages are rendered "
+        "in strips (PNG) or at a lower DPI (other formats).",
+    )
+    parser.add_argument(
+        "--extract",
+        action="store_true",
+        help="Save the embedded image of scanned pages as-is instead of "
+        "rasterizing them (other pages are rendered normally).",
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="FILE",
+        default=None,
+        help="Write per-stage timings (render, encode, write...; totals, "
+        "p50/p95/p99, pages/s) to FILE as JSON.",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        default=None,
+        help="Dump cProfile stats to FILE (main process only: use --jobs 1 "
+        "to include rendering).",
     )
     parser.add_argument(
         "--version", action="version", version=f"%(prog)s {__version__}"
     )
 
     args = parser.parse_args()
-    pdf_to_images(args.pdf_path, dpi=args.dpi, fmt=args.fmt)
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.single_tiff:
+        unsupported = [
+            option
+            for option, given in (
+                ("--fmt", args.fmt not in (None, "tiff")),
+                ("--force", args.force),
+                ("--extract", args.extract),
+            )
+            if given
+        ]
+        if unsupported:
+            parser.error(
+                f"--single-tiff can't be combined with {', '.join(unsupported)}"
+            )
+        args.fmt = "tiff"
+    args.fmt = args.fmt or "png"
+    if args.quality is not None and not 1 <= args.quality <= 100:
+        parser.error("--quality must be between 1 and 100")
+    if args.colorspace == "mono" and args.fmt not in ("png", "tiff", "pnm"):
+        parser.error("--colorspace mono needs --fmt png, tiff or pnm")
+    if args.alpha and (
+        args.fmt not in ("png", "tiff", "pam") or args.colorspace == "mono"
+    ):
+        parser.error("--alpha needs --fmt png, tiff or pam and a non-mono colorspace")
+    try:
+        max_memory = parse_size(args.max_memory) if args.max_memory else None
+    except ValueError as e:
+        parser.error(f"--max-memory: {e}")
+
+    if args.benchmark and (args.stats or args.profile):
+        parser.error("--stats and --profile don't apply to --benchmark")
+    if args.benchmark:
+        pdfs = collect_pdfs(args.pdf_paths, recursive=args.recursive)
+        if not pdfs:
+            parser.error("no PDF files found")
+        benchmark_encoders(pdfs[0], dpi=args.dpi, pages=args.pages)
+        raise SystemExit(0)
+
+    report = profiled(
+        args.profile,
+        pdf_to_images,
+        args.pdf_paths,
+        dpi=args.dpi,
+        fmt=args.fmt,
+        jobs=args.jobs,
+        pages=args.pages,
+        force=args.force,
+        max_memory=max_memory,
+        extract=args.extract,
+        recursive=args.recursive,
+        colorspace=args.colorspace,
+        alpha=args.alpha,
+        compression=args.compression,
+        quality=args.quality,
+        single_tiff=args.single_tiff,
+    )
+    if args.stats and report:
+        save_stats({"settings": vars(args), **report}, args.stats)
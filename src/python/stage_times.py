@@ -0,0 +1,94 @@
+"""Per-stage timings for --stats and cProfile runs for --profile.
+
+Shared by pdf_to_imgs and imgs_to_txt; it imports nothing heavier than the
+standard library, so either tool can use it without loading PyMuPDF.
+"""
+
+import json
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}\n", end="")
+
+
+class StageTimes:
+    """Per-page seconds for each stage, collected in the calling process.
+
+    Workers (processes or threads) time their own pages and send the numbers
+    back with their results, to be added with add_all().
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.samples = {}  # stage -> [seconds, one per page]
+
+    def add(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def add_all(self, timing):
+        for stage, seconds in timing.items():
+            self.add(stage, seconds)
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def report(self, pages):
+        """Totals, p50/p95/p99 (ms) per stage and overall pages/s."""
+        elapsed = time.perf_counter() - self.started
+        return {
+            "pages": pages,
+            "elapsed_s": round(elapsed, 3),
+            "pages_per_s": round(pages / elapsed, 2) if elapsed else None,
+            "stages": {
+                stage: _summarize(values) for stage, values in self.samples.items()
+            },
+        }
+
+
+def _summarize(values):
+    values = sorted(values)
+
+    def percentile(q):
+        # Nearest rank
+        return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+    return {
+        "pages": len(values),
+        "total_s": round(sum(values), 3),
+        "mean_ms": round(1000 * sum(values) / len(values), 2),
+        "p50_ms": round(1000 * percentile(0.50), 2),
+        "p95_ms": round(1000 * percentile(0.95), 2),
+        "p99_ms": round(1000 * percentile(0.99), 2),
+        "max_ms": round(1000 * values[-1], 2),
+    }
+
+
+def save_stats(report, path):
+    """Write a --stats report to `path` as JSON."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    log(f"📊 Stats saved to: {path}")
+
+
+def profiled(profile_path, function, *args, **kwargs):
+    """Call `function`, under cProfile with stats dumped to `profile_path`."""
+    if not profile_path:
+        return function(*args, **kwargs)
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        profiler.dump_stats(profile_path)
+        log(f"🔬 Profile saved to: {profile_path} (python -m pstats {profile_path})")